@@ -0,0 +1,134 @@
+"""
+Arabic text normalization shared by Qur'an indexing and querying.
+
+Mirrors `normalizeArabic` in frontend/src/db/quran.native.ts so the server
+and the native app agree on what matches.
+"""
+
+import re
+from typing import List, Tuple
+
+# Tashkeel, Qur'anic annotation marks and superscript alef
+_TASHKEEL_RE = re.compile('[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]')
+
+_LETTER_FOLDS = str.maketrans({
+    '\u0622': '\u0627',  # alef with madda -> alef
+    '\u0623': '\u0627',  # alef with hamza above -> alef
+    '\u0625': '\u0627',  # alef with hamza below -> alef
+    '\u0671': '\u0627',  # alef wasla -> alef
+    '\u0629': '\u0647',  # ta marbuta -> ha
+    '\u0649': '\u064A',  # alef maksura -> ya
+})
+
+
+def normalize_arabic(text: str) -> str:
+    """Strip tashkeel and fold alef/ta-marbuta/ya variants"""
+    if not text:
+        return ''
+    return _TASHKEEL_RE.sub('', text).translate(_LETTER_FOLDS)
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int], List[int]]:
+    """normalize_arabic plus where each normalized character came from.
+
+    Returns (normalized, starts, ends): normalized character i is
+    text[starts[i]:ends[i]], i.e. the original letter together with the
+    tashkeel that follows it, so a normalized span [a, b) maps back to
+    text[starts[a]:ends[b - 1]].
+    """
+    kept = []
+    starts: List[int] = []
+    ends: List[int] = []
+    for i, char in enumerate(text or ''):
+        if _TASHKEEL_RE.match(char):
+            if ends:
+                ends[-1] = i + 1
+            continue
+        kept.append(char)
+        starts.append(i)
+        ends.append(i + 1)
+    return ''.join(kept).translate(_LETTER_FOLDS), starts, ends
+
+
+# Clitics stripped before matching patterns, longest first
+_ROOT_PREFIXES = ('وال', 'فال', 'بال', 'كال', 'ولل', 'فلل', 'ال', 'لل', 'و', 'ف', 'ب', 'ك', 'ل', 'س')
+# ت + pronoun covers ta marbuta before a possessive suffix (رحمته)
+_ROOT_SUFFIXES = ('تهما', 'كما', 'هما', 'تما', 'تين', 'تان', 'تكم', 'تهم', 'تها', 'تنا', 'ته', 'تك', 'تي',
+                  'ات', 'ون', 'ين', 'ان', 'وا', 'ها', 'هم', 'هن', 'كم', 'كن', 'نا', 'ني', 'ه', 'ي', 'ك', 'ت')
+
+# Hamza on waw/ya folds to a bare hamza while matching patterns, where it
+# acts as a consonant; roots then spell it as alef, as normalize_arabic
+# does for hamza on alef, so آمنوا and المؤمنين share the root امن
+_HAMZA_FOLDS = str.maketrans({'\u0624': '\u0621', '\u0626': '\u0621'})
+_ROOT_HAMZA_FOLD = str.maketrans({'\u0621': '\u0627'})
+
+# Morphological patterns over the root letters ف ع ل (normalized: ة -> ه, no superscript alef)
+_ROOT_PATTERNS = (
+    'فاعل', 'فعال', 'فعيل', 'فعول', 'مفعل', 'افعل', 'يفعل', 'تفعل', 'نفعل', 'فعله', 'فعلن',
+    'مفعول', 'مفاعل', 'مفعله', 'تفعيل', 'فاعله', 'فعاله', 'فعيله', 'فعلان', 'افتعل', 'انفعل', 'تفاعل',
+    'فواعل', 'افعال', 'فعلاء', 'يفعلو', 'مفتعل', 'يفتعل', 'تفتعل', 'نفتعل', 'منفعل', 'متفعل',
+    'استفعل', 'يستفعل', 'تستفعل', 'نستفعل', 'مستفعل', 'افتعال', 'انفعال', 'تفاعيل', 'مفاعيل',
+    'استفعال',
+)
+_PATTERNS_BY_LENGTH = {}
+for _pattern in _ROOT_PATTERNS:
+    _PATTERNS_BY_LENGTH.setdefault(len(_pattern), []).append(_pattern)
+
+
+def _match_pattern(stem: str):
+    """Root letters if the stem fits a known pattern, else None"""
+    for pattern in _PATTERNS_BY_LENGTH.get(len(stem), ()):
+        root = []
+        for letter, slot in zip(stem, pattern):
+            if slot in 'فعل':
+                root.append(letter)
+            elif letter != slot:
+                break
+        else:
+            return ''.join(root)
+    return None
+
+
+def arabic_root(word: str) -> str:
+    """Light root extraction for a normalized word.
+
+    Candidate stems are the word with clitic prefixes/suffixes removed,
+    least stripped first (prefix removal preferred on ties). A suffix
+    strip leaving three letters wins outright: one-letter prefixes are
+    often root letters (كفروا, سجدوا), suffixes seldom are. Otherwise the
+    root is taken from the first stem fitting a pattern, else the first
+    stem that is already three letters; otherwise the shortest stem, so
+    quadriliteral and irregular words still map to something stable.
+    """
+    return _root_stem(word.translate(_HAMZA_FOLDS)).translate(_ROOT_HAMZA_FOLD)
+
+
+def _root_stem(word: str) -> str:
+    """arabic_root before the final hamza fold"""
+    candidates = {}
+    for prefix in ('',) + _ROOT_PREFIXES:
+        if prefix and not word.startswith(prefix):
+            continue
+        rest = word[len(prefix):]
+        for suffix in ('',) + _ROOT_SUFFIXES:
+            if suffix and not rest.endswith(suffix):
+                continue
+            stem = rest[:len(rest) - len(suffix)]
+            rank = (len(prefix) + len(suffix), len(suffix))
+            if len(stem) >= 3 and rank < candidates.get(stem, (len(word), len(word))):
+                candidates[stem] = rank
+    stems = sorted(candidates, key=candidates.get)
+    if not stems:
+        return word
+
+    for stem in stems:
+        if len(stem) == 3 and candidates[stem][1]:
+            return stem
+    for stem in stems:
+        root = _match_pattern(stem)
+        if root:
+            return root
+    for stem in stems:
+        if len(stem) == 3:
+            return stem
+    return min(stems, key=len)
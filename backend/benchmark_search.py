@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for /api/quran/search.
+
+Generates a synthetic corpus shaped like quran_data.json (Qur'an-sized at
+--scale 1), loads the app on it in a child process and drives it through
+an httpx ASGI client, so no server, network or MongoDB is needed. Reports
+p50/p95/p99 latency per query class, throughput under concurrency and
+peak RSS, and exits non-zero when a number regresses past the stored
+baseline.
+
+Usage:
+    python benchmark_search.py                     # compare against the baseline
+    python benchmark_search.py --update-baseline   # record a new baseline
+    python benchmark_search.py --queries log.txt   # replay a query log instead
+
+Latency, throughput and RSS depend on the machine, so the committed
+benchmark_search_baseline.json only shows the expected shape of the
+numbers; before comparing, record a baseline with --update-baseline on the
+machine that runs the check (e.g. the CI runner) from the commit to compare
+against. --workers defaults to the worker count the baseline was recorded
+with, not to SEARCH_WORKERS, so the environment never changes what is being
+compared. A query log has one query per line, optionally prefixed with
+a mode and a tab (`root<TAB>رحم`).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).parent
+DEFAULT_BASELINE = ROOT_DIR / 'benchmark_search_baseline.json'
+# Search worker processes for the app under test when there is no baseline to match
+DEFAULT_WORKERS = 2
+
+_LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهويءأإآةى'
+_TASHKEEL = 'ًَُِّْ'
+_PREFIXES = ('', '', '', 'ال', 'و', 'وال', 'ب', 'ف', 'ل')
+
+# Qur'an-sized at scale 1
+_SURAH_COUNT = 114
+_AYAH_COUNT = 6236
+_AYAH_WORDS = (3, 30)
+_TAFSIR_PER_AYAH = 2
+_TAFSIR_WORDS = (20, 80)
+
+
+def _vocabulary(rng: random.Random, size: int, lengths: Tuple[int, int]) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(_LETTERS) for _ in range(rng.randint(*lengths))))
+    return sorted(words)
+
+
+def _diacritize(word: str, rng: random.Random) -> str:
+    return ''.join(letter + (rng.choice(_TASHKEEL) if rng.random() < 0.8 else '') for letter in word)
+
+
+class SyntheticCorpus:
+    """Zipf-distributed Arabic-like text in the quran_data.json shape.
+
+    Ayahs and tafsir share most of their vocabulary; `tafsir_words` only
+    occur in tafsir, which is what the tafsir-heavy queries search for.
+    """
+
+    def __init__(self, seed: int, scale: float):
+        rng = random.Random(seed)
+        self.rng = rng
+        self.words = _vocabulary(rng, max(200, int(8000 * scale)), (3, 7))
+        self.tafsir_words = _vocabulary(rng, max(100, int(4000 * scale)), (5, 9))
+        self.english = _vocabulary(random.Random(seed + 1), 3000, (3, 9))
+        self._weights = self._zipf(len(self.words))
+        self._tafsir_weights = self._zipf(len(self.tafsir_words))
+
+        ayah_count = max(_SURAH_COUNT, int(_AYAH_COUNT * scale))
+        # Long surahs first, like the mushaf
+        sizes = [1.0 / (i + 1) ** 0.6 for i in range(_SURAH_COUNT)]
+        total = sum(sizes)
+        counts = [max(1, int(ayah_count * size / total)) for size in sizes]
+
+        self.data = {"surahs": []}
+        for number, count in enumerate(counts, start=1):
+            ayahs = []
+            for ayah_number in range(1, count + 1):
+                ayahs.append({
+                    "ayah_number": ayah_number,
+                    "text": ' '.join(_diacritize(rng.choice(_PREFIXES) + w, rng) for w in self.ayah_words()),
+                    "en": ' '.join(rng.choice(self.english) for _ in range(rng.randint(5, 40))),
+                    "tafsir": [{"text": ' '.join(self.tafsir_text())} for _ in range(_TAFSIR_PER_AYAH)],
+                })
+            self.data["surahs"].append({
+                "number": number,
+                "surah": 'سورة ' + self.words[number],
+                "nameEn": f"Surah {number}",
+                "ayahs": ayahs,
+            })
+
+    @staticmethod
+    def _zipf(size: int) -> List[float]:
+        cumulative, total = [], 0.0
+        for rank in range(size):
+            total += 1.0 / (rank + 1) ** 1.07
+            cumulative.append(total)
+        return cumulative
+
+    def word(self) -> str:
+        return self.rng.choices(self.words, cum_weights=self._weights)[0]
+
+    def ayah_words(self) -> List[str]:
+        return [self.word() for _ in range(self.rng.randint(*_AYAH_WORDS))]
+
+    def tafsir_text(self) -> List[str]:
+        words = []
+        for _ in range(self.rng.randint(*_TAFSIR_WORDS)):
+            if self.rng.random() < 0.3:
+                words.append(self.rng.choices(self.tafsir_words, cum_weights=self._tafsir_weights)[0])
+            else:
+                words.append(self.word())
+        return words
+
+    def queries(self, per_class: int) -> List[Tuple[str, str, str]]:
+        """(class, mode, query) triples covering the query mix"""
+        rng = random.Random(7)
+        # Draw from ayah text so multi-word queries have matches
+        ayahs = [a["text"] for s in self.data["surahs"] for a in s["ayahs"]]
+        plain = [''.join(c for c in text if c not in _TASHKEEL) for text in ayahs]
+
+        def words_from(texts: List[str], count: int) -> str:
+            words = rng.choice(texts).split()
+            start = rng.randrange(max(1, len(words) - count + 1))
+            return ' '.join(words[start:start + count])
+
+        mix = []
+        for _ in range(per_class):
+            mix.append(('short', 'text', rng.choice(self.words[:500])[:rng.randint(2, 3)]))
+            mix.append(('word', 'text', rng.choice(self.words)))
+            mix.append(('long', 'text', words_from(plain, rng.randint(4, 6))))
+            mix.append(('diacritized', 'text', words_from(ayahs, 2)))
+            mix.append(('phrase', 'text', '"' + words_from(plain, 3) + '"'))
+            mix.append(('tafsir', 'text', ' '.join(rng.sample(self.tafsir_words[:300], 2))))
+            mix.append(('root', 'root', words_from(plain, 1)))
+            mix.append(('fuzzy', 'fuzzy', rng.choice(self.words[:2000]) + rng.choice(_LETTERS)))
+        return mix
+
+
+def load_query_log(path: Path) -> List[Tuple[str, str, str]]:
+    queries = []
+    for line in path.read_text(encoding='utf-8').splitlines():
+        if not line.strip():
+            continue
+        mode, _, query = line.partition('\t') if '\t' in line else ('text', '', line)
+        queries.append(('log', mode.strip(), query.strip()))
+    return queries
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb(who: int) -> float:
+    """Peak resident set size in MB (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(who).ru_maxrss / divisor, 1)
+
+
+async def run_benchmark(app, queries: List[Tuple[str, str, str]], rounds: int, concurrency: int) -> dict:
+    import httpx
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def request(mode: str, query: str) -> float:
+            started = time.perf_counter()
+            response = await client.get('/api/quran/search', params={'query': query, 'mode': mode, 'limit': 20})
+            response.raise_for_status()
+            return (time.perf_counter() - started) * 1000
+
+        # Warm-up pass (lazy caches, first-touch page faults)
+        for _, mode, query in queries:
+            await request(mode, query)
+
+        latencies: Dict[str, List[float]] = {}
+        for _ in range(rounds):
+            for query_class, mode, query in queries:
+                latencies.setdefault(query_class, []).append(await request(mode, query))
+
+        # Throughput: `concurrency` clients working through the mix
+        pending = [(mode, query) for _ in range(rounds) for _, mode, query in queries]
+
+        async def worker():
+            while pending:
+                mode, query = pending.pop()
+                await request(mode, query)
+
+        total_requests = len(pending)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [ms for samples in latencies.values() for ms in samples]
+    report = {'classes': {}}
+    for query_class, samples in sorted(latencies.items()) + [('all', all_latencies)]:
+        report['classes'][query_class] = {
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p95_ms': round(percentile(samples, 95), 3),
+            'p99_ms': round(percentile(samples, 99), 3),
+        }
+    report['qps'] = round(total_requests / elapsed, 1)
+    return report
+
+
+def compare(report: dict, baseline: dict, latency_tolerance: float, qps_tolerance: float,
+            rss_tolerance: float) -> List[str]:
+    """Human-readable regressions of report against baseline"""
+    regressions = []
+    for query_class, numbers in baseline.get('classes', {}).items():
+        current = report['classes'].get(query_class)
+        if current is None:
+            continue
+        for key, value in numbers.items():
+            # A class has too few samples for a stable p99; only the whole mix is checked there
+            if key == 'p99_ms' and query_class != 'all':
+                continue
+            # Ignore sub-millisecond noise on very fast classes
+            if current[key] > max(value * (1 + latency_tolerance), value + 1.0):
+                regressions.append(f"{query_class} {key}: {current[key]} ms (baseline {value} ms)")
+    if 'qps' in baseline and report['qps'] < baseline['qps'] * (1 - qps_tolerance):
+        regressions.append(f"qps: {report['qps']} (baseline {baseline['qps']})")
+    if 'peak_rss_mb' in baseline and report['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + rss_tolerance):
+        regressions.append(f"peak_rss_mb: {report['peak_rss_mb']} (baseline {baseline['peak_rss_mb']})")
+    return regressions
+
+
+def print_report(report: dict):
+    print(f"{'class':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for query_class, numbers in report['classes'].items():
+        print(f"{query_class:<12} {numbers['p50_ms']:>9} {numbers['p95_ms']:>9} {numbers['p99_ms']:>9}")
+    print(f"qps {report['qps']} (concurrency {report['config']['concurrency']}), "
+          f"peak RSS {report['peak_rss_mb']} MB (workers {report['worker_peak_rss_mb']} MB), "
+          f"startup {report['startup_seconds']} s")
+
+
+def run_app(bench_dir: Path, rounds: int, concurrency: int, workers: int):
+    """Child process: load the app on the generated corpus, run the mix, write report.json.
+
+    Runs apart from the generator so peak RSS measures the app alone.
+    """
+    # The app reads its configuration at import; results must not come from the cache
+    os.environ.update({
+        'QURAN_DATA_PATH': str(bench_dir / 'quran_data.json'),
+        'QURAN_CORPUS_PATH': str(bench_dir / 'quran_corpus.bin'),
+        'SEARCH_WORKERS': str(workers),
+        'SEARCH_CACHE_URL': '',
+        'SEARCH_CACHE_SIZE': '0',
+    })
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'benchmark')
+    sys.path.insert(0, str(ROOT_DIR))
+
+    queries = [tuple(q) for q in json.loads((bench_dir / 'queries.json').read_text(encoding='utf-8'))]
+
+    started = time.perf_counter()
+    import server
+    startup_seconds = round(time.perf_counter() - started, 2)
+    try:
+        report = asyncio.run(run_benchmark(server.app, queries, rounds, concurrency))
+    finally:
+        # Wait for the workers to exit so their peak RSS is accounted for
+        server.QURAN.pool.shutdown(wait=True)
+
+    report['peak_rss_mb'] = peak_rss_mb(resource.RUSAGE_SELF)
+    report['worker_peak_rss_mb'] = peak_rss_mb(resource.RUSAGE_CHILDREN) if workers else 0.0
+    report['startup_seconds'] = startup_seconds
+    (bench_dir / 'report.json').write_text(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /api/quran/search on a synthetic corpus')
+    parser.add_argument('--scale', type=float, default=1.0, help='Corpus size relative to the Qur\'an')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--per-class', type=int, default=25, help='Synthetic queries per query class')
+    parser.add_argument('--queries', type=Path, help='Replay this query log instead of the synthetic mix')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int,
+                        help=f'SEARCH_WORKERS for the app under test (default: as in the baseline, else {DEFAULT_WORKERS})')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--latency-tolerance', type=float, default=0.3)
+    parser.add_argument('--qps-tolerance', type=float, default=0.2)
+    parser.add_argument('--rss-tolerance', type=float, default=0.15)
+    parser.add_argument('--output', type=Path, help='Also write the report here as JSON')
+    parser.add_argument('--run-app', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.workers is None:
+        args.workers = DEFAULT_WORKERS
+        if args.baseline.exists() and not args.update_baseline:
+            args.workers = json.loads(args.baseline.read_text()).get('config', {}).get('workers', DEFAULT_WORKERS)
+
+    if args.run_app:
+        run_app(args.run_app, args.rounds, args.concurrency, args.workers)
+        return
+
+    corpus = SyntheticCorpus(args.seed, args.scale)
+    queries = load_query_log(args.queries) if args.queries else corpus.queries(args.per_class)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_dir = Path(tmp)
+        from quran_corpus import build_corpus_bytes
+        (bench_dir / 'quran_data.json').write_text(json.dumps(corpus.data, ensure_ascii=False), encoding='utf-8')
+        (bench_dir / 'quran_corpus.bin').write_bytes(build_corpus_bytes(corpus.data))
+        (bench_dir / 'queries.json').write_text(json.dumps(queries, ensure_ascii=False), encoding='utf-8')
+        del corpus
+
+        subprocess.run([
+            sys.executable, __file__, '--run-app', str(bench_dir),
+            '--rounds', str(args.rounds), '--concurrency', str(args.concurrency), '--workers', str(args.workers),
+        ], check=True)
+        report = json.loads((bench_dir / 'report.json').read_text())
+
+    report['config'] = {
+        'scale': args.scale, 'seed': args.seed, 'queries': len(queries), 'rounds': args.rounds,
+        'concurrency': args.concurrency, 'workers': args.workers,
+        'query_log': str(args.queries) if args.queries else None,
+    }
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n')
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + '\n')
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get('config') != report['config']:
+        print(f"Baseline was recorded with {baseline.get('config')}; run with the same options or --update-baseline")
+        sys.exit(2)
+    regressions = compare(report, baseline, args.latency_tolerance, args.qps_tolerance, args.rss_tolerance)
+    if regressions:
+        print("Regressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Compile quran_data.json into the binary corpus memory-mapped by server.py.
+
+Usage:
+    python build_quran_corpus.py [quran_data.json] [quran_corpus.bin]
+
+Re-run whenever quran_data.json changes; the server falls back to the JSON
+file (and warns) when the binary corpus is missing or older than it, and
+/api/admin/quran/reload rebuilds an outdated binary corpus itself.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from quran_corpus import TRANSLATION_LANGUAGES, QuranCorpus, write_corpus_file
+
+ROOT_DIR = Path(__file__).parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the binary Qur'an corpus")
+    parser.add_argument('source', nargs='?', default=ROOT_DIR / 'quran_data.json', type=Path)
+    parser.add_argument('output', nargs='?', default=ROOT_DIR / 'quran_corpus.bin', type=Path)
+    args = parser.parse_args()
+
+    with open(args.source, 'r', encoding='utf-8') as f:
+        quran_data = json.load(f)
+
+    size = write_corpus_file(quran_data, args.output)
+
+    corpus = QuranCorpus.open(args.output)
+    translated = ', '.join(
+        f"{sum(1 for d in range(corpus.ayah_count) if corpus.ayah_translation(d, lang))} {lang}"
+        for lang in TRANSLATION_LANGUAGES
+    )
+    print(f"Wrote {args.output} ({size:,} bytes): "
+          f"{corpus.surah_count} surahs, {corpus.ayah_count} ayahs, {corpus.tafsir_count} tafsir entries, "
+          f"translations: {translated}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Materialized per-user daily totals for azkar and charity entries.
+
+One `daily_rollups` document per (user_id, kind, item_id, date) holds the
+summed count and number of sessions (entries) of that item on that day.
+Creating or updating an entry applies the difference with an atomic $inc,
+so daily and range summaries read O(days x items) pre-summed documents
+instead of every raw entry.
+
+The entry write and the rollup $inc are separate operations (MongoDB only
+has multi-document transactions on replica sets), so a failure between
+them can leave a rollup off; `rebuild_all` recomputes them from the raw
+entries. The first startup after deploying backfills automatically.
+
+Only one process rebuilds at a time: it holds a lease on the marker
+document in `migrations`. Every $inc also sets `dirty` on its rollup; a
+rebuild clears the flags first, so any group a live write touched while
+the rebuild read entries is flagged again and recomputed afterwards.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Rollup kind -> (entries collection, item id field)
+ROLLUP_KINDS: Dict[str, Tuple[str, str]] = {
+    'azkar': ('zikr_entries', 'zikr_id'),
+    'charity': ('charity_entries', 'charity_id'),
+}
+
+# Document in `migrations` holding the rebuild lease, and marking the
+# backfill as done once state is "done"
+_BACKFILL_MARKER = 'daily_rollups_backfill'
+
+# A rebuild renews its lease every batch; an expired lease (a crashed
+# process) can be taken over
+_LEASE = timedelta(minutes=5)
+
+# How often processes that lost the backfill claim check whether it is done
+_BACKFILL_POLL_SECONDS = 10
+
+# Wait before looking for groups live writes touched, so an entry written
+# just before the check has its $inc applied too
+_SETTLE_SECONDS = 1
+
+_RECONCILE_PASSES = 5
+
+_REBUILD_BATCH_SIZE = 1000
+
+
+class DailyRollups:
+    """Reads and maintains the daily_rollups collection"""
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db.daily_rollups
+        # False until the backfill is known to be complete; summaries fall
+        # back to grouping raw entries until then
+        self.ready = False
+
+    async def record(self, kind: str, user_id: str, item_id: int, date: str, count: int, sessions: int):
+        """Add count and sessions (either may be negative) to one day's rollup of one item"""
+        try:
+            await self.collection.update_one(
+                {"user_id": user_id, "kind": kind, "date": date, "item_id": item_id},
+                {"$inc": {"count": count, "sessions": sessions}, "$set": {"dirty": True}},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            # The entry itself was written; a rebuild repairs the rollup
+            logger.error(f"Updating {kind} rollup for {user_id}/{item_id}/{date} failed: {e}")
+
+    async def record_many(self, kind: str, entries: List[dict]):
+        """Add newly inserted entries to their rollups, one $inc per (user, item, day)"""
+        _, item_field = ROLLUP_KINDS[kind]
+        deltas: Dict[Tuple[str, int, str], List[int]] = {}
+        for entry in entries:
+            delta = deltas.setdefault((entry["user_id"], entry[item_field], entry["date"]), [0, 0])
+            delta[0] += entry["count"]
+            delta[1] += 1
+        if not deltas:
+            return
+        try:
+            await self.collection.bulk_write([
+                UpdateOne({"user_id": user_id, "kind": kind, "date": date, "item_id": item_id},
+                          {"$inc": {"count": count, "sessions": sessions}, "$set": {"dirty": True}},
+                          upsert=True)
+                for (user_id, item_id, date), (count, sessions) in deltas.items()
+            ], ordered=False)
+        except PyMongoError as e:
+            logger.error(f"Updating {len(deltas)} {kind} rollups failed: {e}")
+
+    async def item_totals(self, kind: str, user_id: str, date_match) -> List[dict]:
+        """[{_id: item_id, count, sessions}] summed over the matching days, by item id"""
+        return await self.collection.aggregate([
+            {"$match": {"user_id": user_id, "kind": kind, "date": date_match}},
+            {"$group": {"_id": "$item_id", "count": {"$sum": "$count"}, "sessions": {"$sum": "$sessions"}}},
+            {"$match": {"sessions": {"$gt": 0}}},
+            {"$sort": {"_id": 1}},
+        ]).to_list(None)
+
+    async def day_item_totals(self, kind: str, user_id: str, date_match) -> List[dict]:
+        """[{date, item_id, count, sessions}] for the matching days, as stored"""
+        return await self.collection.find(
+            {"user_id": user_id, "kind": kind, "date": date_match, "sessions": {"$gt": 0}},
+            {"_id": 0, "date": 1, "item_id": 1, "count": 1, "sessions": 1},
+        ).to_list(None)
+
+    async def _claim(self, after_done: bool) -> bool:
+        """Take the rebuild lease; False while another process holds it (or,
+        unless after_done, once the backfill is done)"""
+        now = datetime.now(timezone.utc)
+        claimable = [{"state": {"$ne": "running"}}, {"lease_until": {"$lt": now}}]
+        query = {"_id": _BACKFILL_MARKER, "$or": claimable}
+        if not after_done:
+            query["state"] = {"$ne": "done"}
+        try:
+            # With no matching document the upsert inserts one, which fails on
+            # _id when the marker exists in a state we may not take over
+            await self.db.migrations.update_one(
+                query, {"$set": {"state": "running", "lease_until": now + _LEASE}}, upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _renew_lease(self):
+        await self.db.migrations.update_one(
+            {"_id": _BACKFILL_MARKER, "state": "running"},
+            {"$set": {"lease_until": datetime.now(timezone.utc) + _LEASE}},
+        )
+
+    async def _group_totals(self, kind: str, key: dict) -> Optional[dict]:
+        """{count, sessions} of one (user, item, day) from the raw entries, or None without entries"""
+        collection_name, item_field = ROLLUP_KINDS[kind]
+        totals = await self.db[collection_name].aggregate([
+            {"$match": {"user_id": key["user_id"], item_field: key["item_id"], "date": key["date"]}},
+            {"$group": {"_id": None, "count": {"$sum": "$count"}, "sessions": {"$sum": 1}}},
+        ]).to_list(1)
+        return totals[0] if totals else None
+
+    async def _reconcile(self, kind: str, key: dict):
+        """Recompute one rollup from the raw entries, deleting it when none are left"""
+        # Cleared before reading, so an $inc racing with this flags it again
+        await self.collection.update_one(key, {"$unset": {"dirty": ""}})
+        totals = await self._group_totals(kind, key)
+        if totals is None:
+            await self.collection.delete_one({**key, "dirty": {"$ne": True}})
+        else:
+            await self.collection.update_one(
+                key, {"$set": {"count": totals["count"], "sessions": totals["sessions"]}}, upsert=True
+            )
+
+    async def _rebuild(self, kind: str) -> int:
+        """Recompute every rollup of one kind; the caller holds the lease.
+        Returns the number of rollups written from the full aggregation."""
+        collection_name, item_field = ROLLUP_KINDS[kind]
+        key_fields = {"_id": 0, "user_id": 1, "kind": 1, "date": 1, "item_id": 1}
+        run_id = uuid.uuid4().hex
+
+        # From here on every $inc flags its group again
+        await self.collection.update_many({"kind": kind, "dirty": True}, {"$unset": {"dirty": ""}})
+
+        groups = self.db[collection_name].aggregate([
+            {"$group": {
+                "_id": {"user_id": "$user_id", "item_id": f"${item_field}", "date": "$date"},
+                "count": {"$sum": "$count"},
+                "sessions": {"$sum": 1},
+            }},
+        ], allowDiskUse=True)
+        written = 0
+        batch = []
+        async for group in groups:
+            key = {"user_id": group["_id"]["user_id"], "kind": kind,
+                   "date": group["_id"]["date"], "item_id": group["_id"]["item_id"]}
+            batch.append(UpdateOne(key, {"$set": {"count": group["count"], "sessions": group["sessions"],
+                                                  "rebuild_run": run_id}}, upsert=True))
+            if len(batch) >= _REBUILD_BATCH_SIZE:
+                await self.collection.bulk_write(batch, ordered=False)
+                await self._renew_lease()
+                written += len(batch)
+                batch = []
+        if batch:
+            await self.collection.bulk_write(batch, ordered=False)
+            written += len(batch)
+
+        # Rollups this run found no entries for: gone, or created by a write
+        # after the aggregation read; each is checked against the raw entries
+        async for key in self.collection.find({"kind": kind, "rebuild_run": {"$ne": run_id}}, key_fields):
+            await self._reconcile(kind, key)
+
+        # Groups live writes touched while the $sets above were computed
+        for _ in range(_RECONCILE_PASSES):
+            await asyncio.sleep(_SETTLE_SECONDS)
+            dirty = await self.collection.find({"kind": kind, "dirty": True}, key_fields).to_list(None)
+            if not dirty:
+                break
+            for key in dirty:
+                await self._reconcile(kind, key)
+            await self._renew_lease()
+        else:
+            logger.warning(f"{kind} rollups still receiving writes after {_RECONCILE_PASSES} passes; "
+                           f"some may need another rebuild")
+        return written
+
+    async def _rebuild_claimed(self) -> Dict[str, int]:
+        try:
+            written = {kind: await self._rebuild(kind) for kind in ROLLUP_KINDS}
+        except BaseException:
+            # Let another process (or a retry) claim it right away
+            await self.db.migrations.update_one(
+                {"_id": _BACKFILL_MARKER, "state": "running"}, {"$set": {"state": "failed"}}
+            )
+            raise
+        await self.db.migrations.update_one(
+            {"_id": _BACKFILL_MARKER},
+            {"$set": {"state": "done", "completed_at": datetime.now(timezone.utc), "written": written},
+             "$unset": {"lease_until": ""}},
+        )
+        self.ready = True
+        return written
+
+    async def rebuild_all(self) -> Optional[Dict[str, int]]:
+        """Recompute every rollup from the raw entries; None if another process is rebuilding"""
+        if not await self._claim(after_done=True):
+            return None
+        return await self._rebuild_claimed()
+
+    async def ensure_backfilled(self):
+        """Build the rollups from existing entries once, in one process, and
+        mark them ready here once that has completed"""
+        try:
+            while True:
+                marker = await self.db.migrations.find_one({"_id": _BACKFILL_MARKER})
+                if marker is not None and marker.get("state") == "done":
+                    self.ready = True
+                    return
+                if await self._claim(after_done=False):
+                    written = await self._rebuild_claimed()
+                    logger.info(f"Backfilled daily rollups: {written}")
+                    return
+                await asyncio.sleep(_BACKFILL_POLL_SECONDS)
+        except PyMongoError as e:
+            logger.error(f"Daily rollup backfill failed; summaries will read raw entries: {e}")
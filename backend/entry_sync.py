@@ -0,0 +1,170 @@
+"""
+Per-user change sequence for azkar and charity entries, for delta sync.
+
+Every insert or update of an entry stamps it with the next value of the
+user's sequence (one counter shared by both collections) and `updated_at`.
+A client keeps the highest seq it has seen and asks for what changed after
+it, so sync traffic follows the number of changes, not the history size.
+
+A seq is reserved before the write that uses it, so writes can become
+visible out of seq order. Each reservation is therefore recorded as
+pending on the counter document, atomically with the $inc, until its
+write has completed; readers never move a cursor past the lowest pending
+seq. A reservation whose process dies mid-write is ignored once its lease
+(WRITE_LEASE) expires. A write that does land after that can be missed by
+cursors already past it, so clients should also run a full sync (since=0)
+now and then, e.g. daily.
+"""
+
+import heapq
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
+
+from daily_rollups import ROLLUP_KINDS
+
+logger = logging.getLogger(__name__)
+
+WRITE_LEASE = timedelta(seconds=60)
+
+# Suggested wait before polling again while writes are still in flight
+RETRY_AFTER_SECONDS = 1
+
+# Marker document in `migrations` written once existing entries have a seq
+_BACKFILL_MARKER = 'entry_seq_backfill'
+
+_BACKFILL_BATCH_SIZE = 1000
+
+
+def _counter_id(user_id: str) -> str:
+    return f"changes:{user_id}"
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # Motor returns naive datetimes holding UTC
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+@asynccontextmanager
+async def stamped_writes(db, user_id: str, docs: List[dict]):
+    """Set seq and updated_at on entry documents (or $set dicts); write them
+    inside the block, so readers hold back until the write has completed"""
+    if not docs:
+        yield
+        return
+    token = uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    # Pipeline update: the new seq and the pending reservation that starts
+    # at it are written in one atomic step
+    counter = await db.counters.find_one_and_update(
+        {"_id": _counter_id(user_id)},
+        [
+            {"$set": {"seq": {"$add": [{"$ifNull": ["$seq", 0]}, len(docs)]}}},
+            {"$set": {"pending": {"$concatArrays": [
+                {"$ifNull": ["$pending", []]},
+                [{"token": token, "first": {"$add": ["$seq", 1 - len(docs)]}, "expires": now + WRITE_LEASE}],
+            ]}}},
+        ],
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    first = counter["seq"] - len(docs) + 1
+    for offset, doc in enumerate(docs):
+        doc["seq"] = first + offset
+        doc["updated_at"] = now
+    try:
+        yield
+    finally:
+        await db.counters.update_one(
+            {"_id": _counter_id(user_id)},
+            {"$pull": {"pending": {"$or": [{"token": token}, {"expires": {"$lt": datetime.now(timezone.utc)}}]}}},
+        )
+
+
+async def _visible_horizon(db, user_id: str) -> Tuple[int, bool]:
+    """Highest seq every write up to which has completed, and whether any
+    write is still in flight"""
+    counter = await db.counters.find_one({"_id": _counter_id(user_id)})
+    if counter is None:
+        return 0, False
+    now = datetime.now(timezone.utc)
+    pending = []
+    for reservation in counter.get("pending", []):
+        if _as_utc(reservation["expires"]) > now:
+            pending.append(reservation["first"])
+        else:
+            logger.warning(f"Ignoring expired change seq reservation {reservation['first']} of {user_id}")
+    if pending:
+        return min(pending) - 1, True
+    return counter["seq"], False
+
+
+async def changes_since(db, user_id: str, since: int, limit: int) -> Tuple[List[Tuple[str, dict]], int, bool, Optional[int]]:
+    """Up to `limit` (kind, entry) changes with seq > since, in seq order.
+
+    Also returns the cursor to resume from, whether more changes can be
+    fetched right away, and (when writes are still in flight past the
+    returned page) seconds to wait before polling again.
+    """
+    # Read before the entries: everything at or below it is already visible
+    horizon, in_flight = await _visible_horizon(db, user_id)
+    per_kind = []
+    if horizon > since:
+        for kind, (collection, _) in ROLLUP_KINDS.items():
+            entries = await db[collection].find(
+                {"user_id": user_id, "seq": {"$gt": since, "$lte": horizon}}
+            ).sort("seq", 1).limit(limit + 1).to_list(limit + 1)
+            per_kind.append([(entry["seq"], kind, entry) for entry in entries])
+    merged = list(heapq.merge(*per_kind, key=lambda change: change[0]))
+
+    page = [(kind, entry) for _, kind, entry in merged[:limit]]
+    has_more = len(merged) > limit
+    next_cursor = page[-1][1]["seq"] if page else since
+    retry_after = RETRY_AFTER_SECONDS if in_flight and not has_more else None
+    return page, next_cursor, has_more, retry_after
+
+
+async def ensure_sequenced(db):
+    """Give entries written before change tracking existed a seq, once,
+    in insertion (_id) order"""
+    try:
+        if await db.migrations.find_one({"_id": _BACKFILL_MARKER}) is not None:
+            return
+        stamped: Dict[str, int] = {}
+        for kind, (collection, _) in ROLLUP_KINDS.items():
+            stamped[kind] = 0
+            batch = []
+            async for entry in db[collection].find({"seq": None}, {"_id": 1, "user_id": 1}).sort("_id", 1):
+                batch.append(entry)
+                if len(batch) >= _BACKFILL_BATCH_SIZE:
+                    stamped[kind] += await _stamp_existing(db, db[collection], batch)
+                    batch = []
+            stamped[kind] += await _stamp_existing(db, db[collection], batch)
+        await db.migrations.update_one(
+            {"_id": _BACKFILL_MARKER},
+            {"$set": {"completed_at": datetime.now(timezone.utc), "stamped": stamped}},
+            upsert=True,
+        )
+        logger.info(f"Assigned change seqs to existing entries: {stamped}")
+    except PyMongoError as e:
+        logger.error(f"Assigning change seqs to existing entries failed: {e}")
+
+
+async def _stamp_existing(db, collection, entries: List[dict]) -> int:
+    by_user: Dict[str, List[dict]] = {}
+    for entry in entries:
+        by_user.setdefault(entry["user_id"], []).append(entry)
+    for user_id, user_entries in by_user.items():
+        changes = [{} for _ in user_entries]
+        async with stamped_writes(db, user_id, changes):
+            await collection.bulk_write([
+                # Only if a concurrent update has not stamped it meanwhile
+                UpdateOne({"_id": entry["_id"], "seq": None}, {"$set": change})
+                for entry, change in zip(user_entries, changes)
+            ], ordered=False)
+    return len(entries)
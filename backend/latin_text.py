@@ -0,0 +1,22 @@
+"""
+Normalization for the Latin-script translations (en, es) searched by
+/api/quran/search.
+
+Case and accents are folded so "Misericordia", "misericórdia" and
+"MISERICORDIA" index alike; anything that is not a letter or digit
+separates words, so "Allah's" is the words "allah" and "s".
+"""
+
+import re
+import unicodedata
+
+_SEPARATOR_RE = re.compile(r'[\W_]+')
+
+
+def fold_latin(text: str) -> str:
+    """Casefold, strip accents and reduce punctuation to single spaces"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _SEPARATOR_RE.sub(' ', stripped).strip()
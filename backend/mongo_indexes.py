@@ -0,0 +1,80 @@
+"""
+MongoDB indexes for the azkar, charity and daily rollup collections.
+
+Every entry query filters on user_id plus the item id or date, and
+history sorts by timestamp; without these indexes each of them is a
+collection scan. `ensure_indexes` runs at startup and is idempotent:
+creating an index that already exists with the same definition is a
+no-op.
+"""
+
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+def _entry_indexes(item_field: str) -> List[IndexModel]:
+    """Indexes shared by zikr_entries (zikr_id) and charity_entries (charity_id)"""
+    return [
+        # history (sorted newest first) and stats for one item
+        IndexModel([('user_id', ASCENDING), (item_field, ASCENDING), ('timestamp', DESCENDING)],
+                   name=f'user_{item_field}_timestamp'),
+        # daily and range summaries
+        IndexModel([('user_id', ASCENDING), ('date', ASCENDING)], name='user_date'),
+        # updates by entry id; also guarantees ids are unique per user
+        IndexModel([('user_id', ASCENDING), ('id', ASCENDING)], name='user_entry_id', unique=True),
+        # delta sync: changes after a cursor, in seq order
+        IndexModel([('user_id', ASCENDING), ('seq', ASCENDING)], name='user_seq'),
+    ]
+
+
+# Collection name -> indexes it must have
+EXPECTED_INDEXES: Dict[str, List[IndexModel]] = {
+    'zikr_entries': _entry_indexes('zikr_id'),
+    'charity_entries': _entry_indexes('charity_id'),
+    # one document per (user, kind, day, item); date before item_id so
+    # range summaries scan one contiguous key range
+    'daily_rollups': [
+        IndexModel([('user_id', ASCENDING), ('kind', ASCENDING), ('date', ASCENDING), ('item_id', ASCENDING)],
+                   name='user_kind_date_item', unique=True),
+    ],
+}
+
+
+async def ensure_indexes(db) -> List[str]:
+    """Create any missing indexes, then return (and warn about) those still missing.
+
+    Failures are logged rather than raised so a database problem never
+    keeps the API from starting.
+    """
+    for collection, indexes in EXPECTED_INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except PyMongoError as e:
+            logger.error(f"Creating indexes on {collection} failed: {e}")
+    return await missing_indexes(db)
+
+
+async def missing_indexes(db) -> List[str]:
+    """`collection.index_name` for every expected index whose key pattern (and uniqueness) is absent"""
+    missing = []
+    for collection, indexes in EXPECTED_INDEXES.items():
+        try:
+            existing = await db[collection].index_information()
+        except PyMongoError as e:
+            logger.error(f"Listing indexes on {collection} failed: {e}")
+            missing.extend(f"{collection}.{index.document['name']}" for index in indexes)
+            continue
+        present = {(tuple(tuple(field) for field in info['key']), bool(info.get('unique'))) for info in existing.values()}
+        for index in indexes:
+            wanted = (tuple(index.document['key'].items()), bool(index.document.get('unique')))
+            if wanted not in present:
+                missing.append(f"{collection}.{index.document['name']}")
+
+    if missing:
+        logger.warning(f"Missing MongoDB indexes: {', '.join(missing)}")
+    return missing
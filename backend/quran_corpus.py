@@ -0,0 +1,286 @@
+"""
+Compact binary Qur'an corpus, memory-mapped at startup.
+
+`build_quran_corpus.py` compiles quran_data.json into this format once;
+every uvicorn worker then maps the same file read-only so the pages are
+shared through the OS page cache instead of each process holding its own
+dict-of-dicts. Strings are decoded on access.
+
+Tafsir bodies, the bulk of the data, live in their own blob at the end of
+the file so ayah text stays densely packed; they are only paged in when a
+result needs them (see `QuranCorpus.tafsir`).
+
+Layout (all integers little-endian uint32):
+
+    header     magic b'QRNC', version, surah_count S, ayah_count A,
+               tafsir_count T, string_count N
+    surahs     number[S], name_ar[S], name_en[S], first_ayah[S + 1]
+    ayahs      surah_index[A], ayah_number[A], text[A], en[A], es[A],
+               first_tafsir[A + 1]
+    strings    offsets[N + 1]
+    tafsir     offsets[T + 1]
+    blobs      UTF-8 string blob, then UTF-8 tafsir blob
+
+name_ar, name_en, text and translation (en, es) columns hold string ids;
+a missing translation is the empty string.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import weakref
+from array import array
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MAGIC = b'QRNC'
+VERSION = 3
+_HEADER = struct.Struct('<4sIIIII')
+
+# Ayahs whose tafsir stays decoded in memory
+TAFSIR_CACHE_SIZE = 512
+
+# Translation fields of an ayah in quran_data.json, in column order
+TRANSLATION_LANGUAGES = ('en', 'es')
+
+
+class _StringTable:
+    """Deduplicating string table used while building a corpus"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.offsets = array('I', [0])
+        self.blob = bytearray()
+
+    def add(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.ids)
+            self.ids[value] = string_id
+            self.blob += value.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return string_id
+
+
+def build_corpus_bytes(quran_data: dict) -> bytes:
+    """Serialize QURAN_DATA-shaped JSON into the binary corpus format"""
+    strings = _StringTable()
+    surah_number, surah_name_ar, surah_name_en, surah_first_ayah = (array('I') for _ in range(4))
+    ayah_surah, ayah_number, ayah_text, ayah_first_tafsir = (array('I') for _ in range(4))
+    ayah_translations = {lang: array('I') for lang in TRANSLATION_LANGUAGES}
+    tafsir_offsets = array('I', [0])
+    tafsir_blob = bytearray()
+
+    for surah_index, s in enumerate(quran_data['surahs']):
+        surah_number.append(s['number'])
+        surah_name_ar.append(strings.add(s['surah']))
+        surah_name_en.append(strings.add(s.get('nameEn', f"Surah {s['number']}")))
+        surah_first_ayah.append(len(ayah_number))
+        for a in s['ayahs']:
+            ayah_surah.append(surah_index)
+            ayah_number.append(a['ayah_number'])
+            ayah_text.append(strings.add(a['text']))
+            for lang in TRANSLATION_LANGUAGES:
+                ayah_translations[lang].append(strings.add(a.get(lang) or ''))
+            ayah_first_tafsir.append(len(tafsir_offsets) - 1)
+            for tafsir_item in a.get('tafsir') or []:
+                tafsir_blob += (tafsir_item.get('text', '') or '').encode('utf-8')
+                tafsir_offsets.append(len(tafsir_blob))
+    surah_first_ayah.append(len(ayah_number))
+    ayah_first_tafsir.append(len(tafsir_offsets) - 1)
+
+    columns = [
+        surah_number, surah_name_ar, surah_name_en, surah_first_ayah,
+        ayah_surah, ayah_number, ayah_text, *ayah_translations.values(), ayah_first_tafsir,
+        strings.offsets,
+        tafsir_offsets,
+    ]
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, len(surah_number), len(ayah_number),
+                                 len(tafsir_offsets) - 1, len(strings.ids)))
+    for column in columns:
+        if sys.byteorder != 'little':
+            column.byteswap()
+        out += column.tobytes()
+    out += strings.blob
+    out += tafsir_blob
+    return bytes(out)
+
+
+def write_corpus_file(quran_data: dict, path: Path) -> int:
+    """Build the binary corpus into path; returns its size in bytes"""
+    corpus_bytes = build_corpus_bytes(quran_data)
+    # Write to a temp file and rename so running workers never map a partial
+    # file; a unique name lets several processes rebuild at once
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), 0o644)
+            f.write(corpus_bytes)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(corpus_bytes)
+
+
+class QuranCorpus:
+    """Read-only view over a binary corpus held in a buffer or mmap"""
+
+    def __init__(self, buffer):
+        if sys.byteorder != 'little':
+            raise RuntimeError("Binary Qur'an corpus requires a little-endian host")
+
+        self._buffer = buffer
+        magic, version, surah_count, ayah_count, tafsir_count, string_count = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unsupported Qur'an corpus (magic={magic!r}, version={version})")
+
+        self.surah_count = surah_count
+        self.ayah_count = ayah_count
+        self.tafsir_count = tafsir_count
+
+        words = memoryview(buffer)[_HEADER.size:].cast('B')
+        position = 0
+
+        def column(length: int) -> memoryview:
+            nonlocal position
+            view = words[position:position + 4 * length].cast('I')
+            position += 4 * length
+            return view
+
+        self._surah_number = column(surah_count)
+        self._surah_name_ar = column(surah_count)
+        self._surah_name_en = column(surah_count)
+        self._surah_first_ayah = column(surah_count + 1)
+        self._ayah_surah = column(ayah_count)
+        self._ayah_number = column(ayah_count)
+        self._ayah_text = column(ayah_count)
+        self._ayah_translations = {lang: column(ayah_count) for lang in TRANSLATION_LANGUAGES}
+        self._ayah_first_tafsir = column(ayah_count + 1)
+        self._string_offsets = column(string_count + 1)
+        self._tafsir_offsets = column(tafsir_count + 1)
+        blob_start = _HEADER.size + position
+        tafsir_start = blob_start + self._string_offsets[string_count]
+        self._blob = words[position:position + self._string_offsets[string_count]]
+        self._tafsir_blob = memoryview(buffer)[tafsir_start:]
+        self._tafsir_start = tafsir_start
+
+        # Surah number -> surah index, (surah number, ayah number) -> ayah doc id
+        self._surah_indexes: Dict[int, int] = {self._surah_number[i]: i for i in range(surah_count)}
+        self._ayah_docs: Dict[Tuple[int, int], int] = {
+            (self._surah_number[self._ayah_surah[d]], self._ayah_number[d]): d
+            for d in range(ayah_count)
+        }
+        # The cache reaches the corpus through a weak reference: holding the
+        # bound method would make a cycle that only the cyclic GC can free,
+        # and gc.freeze() before forking search workers exempts it from that
+        load_tafsir = weakref.WeakMethod(self._load_tafsir)
+        self.tafsir = lru_cache(maxsize=TAFSIR_CACHE_SIZE)(
+            lambda surah_number, ayah_number: load_tafsir()(surah_number, ayah_number)
+        )
+
+        # Surah metadata is tiny and read on every search result, so keep it decoded
+        self.surahs: List[dict] = [
+            {
+                "number": self._surah_number[i],
+                "nameAr": self.string(self._surah_name_ar[i]),
+                "nameEn": self.string(self._surah_name_en[i]),
+            }
+            for i in range(surah_count)
+        ]
+
+    @classmethod
+    def open(cls, path: Path) -> 'QuranCorpus':
+        """Memory-map a corpus file built by build_quran_corpus.py"""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped)
+
+    @classmethod
+    def from_json(cls, quran_data: dict) -> 'QuranCorpus':
+        """In-memory corpus for when no prebuilt file is available"""
+        return cls(build_corpus_bytes(quran_data))
+
+    @cached_property
+    def digest(self) -> str:
+        """Content hash identifying this version of the corpus"""
+        return hashlib.sha256(self._buffer).hexdigest()[:16]
+
+    def string(self, string_id: int) -> str:
+        start = self._string_offsets[string_id]
+        end = self._string_offsets[string_id + 1]
+        return str(self._blob[start:end], 'utf-8')
+
+    def surah_ayahs(self, surah_index: int) -> range:
+        """Ayah doc ids belonging to a surah"""
+        return range(self._surah_first_ayah[surah_index], self._surah_first_ayah[surah_index + 1])
+
+    def ayah_surah(self, doc_id: int) -> dict:
+        """Surah metadata ({number, nameAr, nameEn}) for an ayah doc id"""
+        return self.surahs[self._ayah_surah[doc_id]]
+
+    def ayah_number(self, doc_id: int) -> int:
+        return self._ayah_number[doc_id]
+
+    def ayah_text(self, doc_id: int) -> str:
+        return self.string(self._ayah_text[doc_id])
+
+    def ayah_translation(self, doc_id: int, lang: str) -> Optional[str]:
+        """Translation of an ayah (lang in TRANSLATION_LANGUAGES), None if the corpus has none"""
+        return self.string(self._ayah_translations[lang][doc_id]) or None
+
+    def tafsir_range(self, doc_id: int) -> range:
+        """Tafsir ids belonging to an ayah doc id"""
+        return range(self._ayah_first_tafsir[doc_id], self._ayah_first_tafsir[doc_id + 1])
+
+    def ayah_doc(self, surah_number: int, ayah_number: int) -> int:
+        """Ayah doc id for a surah/ayah pair; KeyError if it does not exist"""
+        return self._ayah_docs[(surah_number, ayah_number)]
+
+    def surah_index(self, surah_number: int) -> int:
+        """Surah index for a surah number; KeyError if it does not exist"""
+        return self._surah_indexes[surah_number]
+
+    def ayah_range(self, surah_number: int, from_ayah: int = 1, to_ayah: Optional[int] = None) -> range:
+        """Ayah doc ids for ayahs from_ayah..to_ayah of a surah, clamped to the surah.
+
+        KeyError if the surah does not exist; the range is empty when the
+        requested ayahs fall outside it.
+        """
+        docs = self.surah_ayahs(self.surah_index(surah_number))
+        if not docs:
+            return docs
+        first_ayah = self._ayah_number[docs.start]
+        last_ayah = self._ayah_number[docs.stop - 1]
+        from_ayah = max(from_ayah, first_ayah)
+        to_ayah = last_ayah if to_ayah is None else min(to_ayah, last_ayah)
+        if from_ayah > to_ayah:
+            return range(docs.start, docs.start)
+        return range(self._ayah_docs[(surah_number, from_ayah)], self._ayah_docs[(surah_number, to_ayah)] + 1)
+
+    def tafsir_text(self, tafsir_id: int) -> str:
+        start = self._tafsir_offsets[tafsir_id]
+        end = self._tafsir_offsets[tafsir_id + 1]
+        return str(self._tafsir_blob[start:end], 'utf-8')
+
+    def _load_tafsir(self, surah_number: int, ayah_number: int) -> Tuple[str, ...]:
+        """Tafsir bodies of one ayah, read from the tafsir blob (cached via `tafsir`)"""
+        doc_id = self.ayah_doc(surah_number, ayah_number)
+        return tuple(self.tafsir_text(t) for t in self.tafsir_range(doc_id))
+
+    def release_tafsir_pages(self):
+        """Drop mapped tafsir pages from this process after a full pass (e.g. indexing).
+
+        The pages stay in the OS page cache and fault back in on demand.
+        """
+        if not isinstance(self._buffer, mmap.mmap) or not hasattr(mmap, 'MADV_DONTNEED'):
+            return
+        start = self._tafsir_start - self._tafsir_start % mmap.PAGESIZE
+        length = len(self._buffer) - start
+        if length > 0:
+            self._buffer.madvise(mmap.MADV_DONTNEED, start, length)
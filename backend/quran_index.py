@@ -0,0 +1,524 @@
+"""
+Inverted index over the Qur'an corpus used by /api/quran/search.
+
+Built once from the Qur'an corpus at startup so a query only touches the
+ayahs that can actually match instead of scanning the whole corpus.
+"""
+
+import heapq
+import math
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from arabic_text import arabic_root, normalize_arabic, normalize_with_offsets
+from latin_text import fold_latin
+from quran_corpus import TRANSLATION_LANGUAGES, QuranCorpus
+from quran_vocabulary import FuzzyVocabulary, PrefixSuggester
+
+# Longest n-gram kept in the vocabulary index; shorter query tokens are
+# looked up directly, longer ones intersect their n-grams
+NGRAM_SIZE = 3
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Tafsir matches count for less than matches in the ayah text itself
+TAFSIR_WEIGHT = 0.5
+
+# Word distance used by a bare NEAR operator
+DEFAULT_NEAR_DISTANCE = 5
+
+# Query modes: literal (substring) matching, matching by Arabic root, or
+# literal matching widened to vocabulary words within a small edit distance
+SEARCH_MODES = ('text', 'root', 'fuzzy')
+
+# Searchable languages: the Arabic text (with tafsir) and each translation
+SEARCH_LANGUAGES = ('ar',) + TRANSLATION_LANGUAGES
+
+_QUERY_PART_RE = re.compile(r'"([^"]*)"|(\S+)')
+_NEAR_RE = re.compile(r'^NEAR(?:/(\d+))?$')
+_WORD_RE = re.compile(r'\S+')
+
+
+class SearchQuery:
+    """A parsed search: plain terms, "exact phrases" and `a NEAR/k b` pairs.
+
+    Every token is required (AND). Phrase and proximity constraints are
+    checked against ayah word positions only; tafsir is not positional.
+    In root mode every token is reduced to its root and matched against the
+    root index of the ayah text; in fuzzy mode every token also matches
+    ayah vocabulary words within its edit budget.
+
+    `langs` picks the texts searched; translations are matched on
+    `translation_terms`, the case- and accent-folded query words.
+    """
+
+    def __init__(self, terms: List[str], phrases: List[List[str]], near: List[Tuple[str, str, int]],
+                 mode: str = 'text', langs: Tuple[str, ...] = ('ar',), translation_terms: Optional[List[str]] = None):
+        self.terms = terms
+        self.phrases = phrases
+        self.near = near
+        self.mode = mode
+        self.langs = langs
+        self.translation_terms = translation_terms or []
+
+    @property
+    def tokens(self) -> List[str]:
+        """Every token the query requires"""
+        tokens = list(self.terms)
+        for phrase in self.phrases:
+            tokens.extend(phrase)
+        for left, right, _ in self.near:
+            tokens.extend((left, right))
+        return tokens
+
+    @property
+    def empty(self) -> bool:
+        """True if nothing in the query can match in the selected languages"""
+        return not (('ar' in self.langs and self.tokens) or self.translation_terms)
+
+    @property
+    def positional(self) -> bool:
+        return self.mode == 'text' and bool(self.phrases or self.near)
+
+    def cache_key(self) -> str:
+        """Canonical form of the query, stable across spacing and diacritics"""
+        parts = list(self.terms)
+        parts.extend('"' + ' '.join(phrase) + '"' for phrase in self.phrases)
+        parts.extend(f"{left} NEAR/{distance} {right}" for left, right, distance in self.near)
+        if self.translation_terms:
+            parts.append('|' + ' '.join(self.translation_terms))
+        return f"{self.mode}:{','.join(self.langs)}:" + ' '.join(parts)
+
+
+def parse_search_query(query: str, mode: str = 'text', langs: Tuple[str, ...] = ('ar',)) -> SearchQuery:
+    """Normalize and parse a raw query string.
+
+    `"a b c"` is an exact phrase; `a NEAR/k b` (or `a NEAR b`, k=5) needs
+    the two words within k words of each other; anything else is a term.
+    In root and fuzzy modes quotes and NEAR are ignored and every word is a
+    plain term (reduced to its root in root mode). Translations are always
+    searched for plain terms.
+    """
+    plain_words = [word for word in query.replace('"', ' ').split() if not _NEAR_RE.match(word)]
+    translation_terms = fold_latin(' '.join(plain_words)).split() if set(langs) - {'ar'} else []
+
+    if mode == 'root':
+        roots = [arabic_root(word) for word in normalize_arabic(' '.join(plain_words)).split()]
+        return SearchQuery(roots, [], [], mode, langs, translation_terms)
+    if mode == 'fuzzy':
+        return SearchQuery(normalize_arabic(' '.join(plain_words)).split(), [], [], mode, langs, translation_terms)
+
+    parts: List[List[str]] = []
+    for match in _QUERY_PART_RE.finditer(query):
+        if match.group(1) is not None:
+            phrase = normalize_arabic(match.group(1)).split()
+            if phrase:
+                parts.append(phrase)
+        else:
+            raw = match.group(2)
+            if _NEAR_RE.match(raw):
+                parts.append([raw])
+                continue
+            token = normalize_arabic(raw.strip('"'))
+            if token:
+                parts.append([token])
+
+    terms: List[str] = []
+    phrases: List[List[str]] = []
+    near: List[Tuple[str, str, int]] = []
+    i = 0
+    while i < len(parts):
+        part = parts[i]
+        operator = _NEAR_RE.match(part[0]) if len(part) == 1 else None
+        if operator:
+            # A dangling operator, or one next to a phrase, is dropped
+            i += 1
+            continue
+        following = _NEAR_RE.match(parts[i + 1][0]) if i + 2 < len(parts) and len(parts[i + 1]) == 1 else None
+        if following and len(part) == 1 and len(parts[i + 2]) == 1 and not _NEAR_RE.match(parts[i + 2][0]):
+            distance = int(following.group(1)) if following.group(1) else DEFAULT_NEAR_DISTANCE
+            near.append((part[0], parts[i + 2][0], distance))
+            i += 3
+            continue
+        if len(part) == 1:
+            terms.append(part[0])
+        else:
+            phrases.append(part)
+        i += 1
+    return SearchQuery(terms, phrases, near, mode, langs, translation_terms)
+
+
+def _has_phrase(position_lists: List[List[int]]) -> bool:
+    """True if positions p, p+1, ... occur in consecutive lists"""
+    following = [set(positions) for positions in position_lists[1:]]
+    return any(
+        all(start + offset in positions for offset, positions in enumerate(following, start=1))
+        for start in position_lists[0]
+    )
+
+
+def _within(left: List[int], right: List[int], distance: int) -> bool:
+    """True if some pair of sorted positions is at most `distance` apart"""
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if abs(left[i] - right[j]) <= distance:
+            return True
+        if left[i] < right[j]:
+            i += 1
+        else:
+            j += 1
+    return False
+
+
+def _word_ngrams(word: str) -> Set[str]:
+    """All substrings of a word with length 1..NGRAM_SIZE"""
+    grams = set()
+    for n in range(1, NGRAM_SIZE + 1):
+        for i in range(len(word) - n + 1):
+            grams.add(word[i:i + n])
+    return grams
+
+
+class InvertedIndex:
+    """Word postings plus an n-gram index over the vocabulary.
+
+    Query tokens keep the original substring semantics (`tok in text`):
+    since tokens never contain whitespace, a token occurs in a document
+    exactly when it occurs inside one of the document's words. Indexes
+    built with substring=False only match whole words and skip the n-grams.
+    """
+
+    def __init__(self, texts: Iterable[str], positional: bool = False, substring: bool = True):
+        self.substring = substring
+        self.postings: Dict[str, Dict[int, int]] = {}  # word -> {doc id: term frequency}
+        # word -> {doc id: word positions}, only kept for positional indexes
+        self.positions: Optional[Dict[str, Dict[int, List[int]]]] = {} if positional else None
+        self.ngrams: Dict[str, Set[str]] = {}  # n-gram -> words containing it
+        self.doc_lengths: List[int] = []
+
+        for doc_id, text in enumerate(texts):
+            words = text.split()
+            self.doc_lengths.append(len(words))
+            for position, word in enumerate(words):
+                docs = self.postings.setdefault(word, {})
+                docs[doc_id] = docs.get(doc_id, 0) + 1
+                if self.positions is not None:
+                    self.positions.setdefault(word, {}).setdefault(doc_id, []).append(position)
+
+        self.doc_count = len(self.doc_lengths)
+        self.avg_doc_length = sum(self.doc_lengths) / self.doc_count if self.doc_count else 0.0
+
+        if substring:
+            for word in self.postings:
+                for gram in _word_ngrams(word):
+                    self.ngrams.setdefault(gram, set()).add(word)
+
+    def matching_words(self, token: str) -> Set[str]:
+        """Vocabulary words containing the token as a substring"""
+        if not self.substring:
+            return {token} if token in self.postings else set()
+        if len(token) <= NGRAM_SIZE:
+            return self.ngrams.get(token, set())
+
+        grams = [token[i:i + NGRAM_SIZE] for i in range(len(token) - NGRAM_SIZE + 1)]
+        candidate_sets = []
+        for gram in grams:
+            words = self.ngrams.get(gram)
+            if not words:
+                return set()
+            candidate_sets.append(words)
+
+        candidate_sets.sort(key=len)
+        candidates = set(candidate_sets[0])
+        for words in candidate_sets[1:]:
+            candidates &= words
+            if not candidates:
+                return candidates
+        return {w for w in candidates if token in w}
+
+    def token_frequencies(self, token: str, extra_words: Iterable[str] = ()) -> Dict[int, int]:
+        """Doc id -> number of words in the document containing the token (or one of extra_words)"""
+        words = self.matching_words(token)
+        extra = [w for w in extra_words if w in self.postings and w not in words]
+        freqs: Dict[int, int] = {}
+        for word in list(words) + extra:
+            for doc_id, tf in self.postings[word].items():
+                freqs[doc_id] = freqs.get(doc_id, 0) + tf
+        return freqs
+
+    def token_positions(self, token: str, doc_ids: Set[int]) -> Dict[int, List[int]]:
+        """Doc id -> sorted positions of words containing the token, for the given docs"""
+        found: Dict[int, List[int]] = {}
+        for word in self.matching_words(token):
+            word_positions = self.positions[word]
+            if len(doc_ids) < len(word_positions):
+                pairs = ((d, word_positions[d]) for d in doc_ids if d in word_positions)
+            else:
+                pairs = ((d, p) for d, p in word_positions.items() if d in doc_ids)
+            for doc_id, positions in pairs:
+                found.setdefault(doc_id, []).extend(positions)
+        for positions in found.values():
+            positions.sort()
+        return found
+
+    def filter_positional(self, query: SearchQuery, doc_ids: Set[int]) -> Set[int]:
+        """Subset of docs satisfying every phrase and NEAR constraint of the query"""
+        matched = set(doc_ids)
+        positions_cache: Dict[str, Dict[int, List[int]]] = {}
+
+        def positions(token: str) -> Dict[int, List[int]]:
+            if token not in positions_cache:
+                positions_cache[token] = self.token_positions(token, matched)
+            return positions_cache[token]
+
+        for phrase in query.phrases:
+            lists = [positions(token) for token in phrase]
+            matched = {d for d in matched if _has_phrase([token_lists[d] for token_lists in lists])}
+        for left, right, distance in query.near:
+            left_lists, right_lists = positions(left), positions(right)
+            matched = {d for d in matched if _within(left_lists[d], right_lists[d], distance)}
+        return matched
+
+    def search(self, tokens: List[str], expansions: Optional[Dict[str, Iterable[str]]] = None) -> Dict[int, float]:
+        """BM25 score of every document containing all tokens (AND search).
+
+        `expansions` maps a token to extra whole words that also satisfy it.
+        """
+        if not tokens:
+            return {}
+        expansions = expansions or {}
+
+        # Rarest tokens first keeps the running intersection small
+        token_freqs = sorted((self.token_frequencies(t, expansions.get(t, ())) for t in tokens), key=len)
+        matched = set(token_freqs[0])
+        for freqs in token_freqs[1:]:
+            matched = {doc_id for doc_id in matched if doc_id in freqs}
+            if not matched:
+                return {}
+
+        scores = dict.fromkeys(matched, 0.0)
+        for freqs in token_freqs:
+            df = len(freqs)
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for doc_id in matched:
+                tf = freqs[doc_id]
+                norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / self.avg_doc_length
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+        return scores
+
+    def iter_docs(self, tokens: List[str], expansions: Optional[Dict[str, Iterable[str]]] = None) -> Iterator[int]:
+        """Documents containing every token, in doc id order, produced lazily"""
+        if not tokens:
+            return
+        expansions = expansions or {}
+        token_freqs = sorted((self.token_frequencies(t, expansions.get(t, ())) for t in tokens), key=len)
+        for doc_id in sorted(token_freqs[0]):
+            if all(doc_id in freqs for freqs in token_freqs[1:]):
+                yield doc_id
+
+
+class QuranSearchIndex:
+    """Ayah text and tafsir indexes built from normalized corpus text.
+
+    Doc ids are the corpus ayah doc ids. Queries come from
+    `parse_search_query`, which normalizes them the same way.
+    """
+
+    def __init__(self, corpus: QuranCorpus):
+        self.corpus = corpus
+        # Ayah doc id -> normalized ayah text, computed once at load time
+        self.ayah_norm: List[str] = [normalize_arabic(corpus.ayah_text(d)) for d in range(corpus.ayah_count)]
+        # Tafsir doc id -> owning ayah doc id
+        self.tafsir_owner: List[int] = []
+        for doc_id in range(corpus.ayah_count):
+            self.tafsir_owner.extend([doc_id] * len(corpus.tafsir_range(doc_id)))
+
+        # Ayah text keeps word positions for phrase and NEAR queries
+        self.ayah_index = InvertedIndex(self.ayah_norm, positional=True)
+
+        # Root -> ayah postings: every ayah word is replaced by its root once, here,
+        # so a root query is a plain dictionary lookup
+        self.word_roots: Dict[str, str] = {word: arabic_root(word) for word in self.ayah_index.postings}
+        self.root_index = InvertedIndex(
+            (' '.join(self.word_roots[word] for word in text.split()) for text in self.ayah_norm),
+            substring=False,
+        )
+
+        # Typo tolerance: distinct ayah words, searchable by edit distance
+        self.vocabulary = FuzzyVocabulary(self.ayah_index.postings)
+
+        # Autocomplete: ayah words ranked by how often they occur in the corpus,
+        # and surah names (Arabic with and without the article, English per word)
+        self.suggester = PrefixSuggester(
+            {word: sum(postings.values()) for word, postings in self.ayah_index.postings.items()}
+        )
+        self.surah_keys: List[Tuple[Set[str], int]] = []
+        for surah_index, surah in enumerate(corpus.surahs):
+            name_ar = normalize_arabic(surah['nameAr'])
+            keys = {name_ar, name_ar[2:] if name_ar.startswith('ال') else name_ar}
+            keys.update(part for part in re.split(r'[\s-]+', surah['nameEn'].casefold()) if part)
+            keys.add(surah['nameEn'].casefold())
+            self.surah_keys.append((keys, surah_index))
+
+        # One index per translation, over case- and accent-folded words
+        self.translation_indexes: Dict[str, InvertedIndex] = {
+            lang: InvertedIndex(fold_latin(corpus.ayah_translation(d, lang) or '') for d in range(corpus.ayah_count))
+            for lang in TRANSLATION_LANGUAGES
+        }
+
+        # Tafsir bodies are decoded from the corpus one at a time and not kept;
+        # afterwards only the index stays resident and bodies load on demand
+        self.tafsir_index = InvertedIndex(
+            normalize_arabic(corpus.tafsir_text(t)) for t in range(corpus.tafsir_count)
+        )
+        corpus.release_tafsir_pages()
+
+    def search(self, query: SearchQuery) -> Dict[int, float]:
+        """Relevance score per ayah doc id matching the query in any of its languages.
+
+        Scores from the Arabic text and from each translation add up.
+        """
+        scores = self._search_arabic(query) if 'ar' in query.langs else {}
+        for lang in query.langs:
+            if lang in self.translation_indexes:
+                for doc_id, score in self.translation_indexes[lang].search(query.translation_terms).items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+        return scores
+
+    def _search_arabic(self, query: SearchQuery) -> Dict[int, float]:
+        """Scores of ayahs whose text or any single tafsir entry contains all tokens.
+
+        Phrase and NEAR queries are answered from ayah positions only.
+        """
+        tokens = query.tokens
+        if query.mode == 'root':
+            return self.root_index.search(tokens)
+
+        expansions = self.expansions(query)
+        scores = self.ayah_index.search(tokens, expansions)
+        if query.positional:
+            matched = self.ayah_index.filter_positional(query, set(scores))
+            return {doc_id: score for doc_id, score in scores.items() if doc_id in matched}
+
+        # An ayah is credited with its best matching tafsir entry only
+        tafsir_best: Dict[int, float] = {}
+        for tafsir_doc, score in self.tafsir_index.search(tokens, expansions).items():
+            owner = self.tafsir_owner[tafsir_doc]
+            if score > tafsir_best.get(owner, 0.0):
+                tafsir_best[owner] = score
+        for owner, score in tafsir_best.items():
+            scores[owner] = scores.get(owner, 0.0) + TAFSIR_WEIGHT * score
+        return scores
+
+    def expansions(self, query: SearchQuery) -> Dict[str, List[str]]:
+        """Fuzzy mode: token -> vocabulary words within its edit budget"""
+        if query.mode != 'fuzzy':
+            return {}
+        return {token: [word for _, word in self.vocabulary.similar(token)] for token in query.tokens}
+
+    def suggest(self, prefix: str, limit: int) -> Tuple[List[Tuple[str, int]], List[dict]]:
+        """Completions of the last word of prefix, and surahs whose name starts with it"""
+        words = normalize_arabic(prefix).split()
+        if not words:
+            return [], []
+        last = words[-1]
+        completions = list(self.suggester.complete(last, limit))
+
+        casefolded = prefix.strip().casefold()
+        surahs = [
+            self.corpus.surahs[surah_index]
+            for keys, surah_index in self.surah_keys
+            if any(key.startswith(last) or key.startswith(casefolded) for key in keys)
+        ]
+        return completions, surahs[:limit]
+
+    def _word_spans(self, query: SearchQuery, token: str, word: str,
+                    expansions: Dict[str, List[str]]) -> List[Tuple[int, int]]:
+        """Where a query token matches inside one normalized ayah word"""
+        if query.mode == 'root':
+            return [(0, len(word))] if self.word_roots.get(word) == token else []
+        spans = []
+        start = word.find(token)
+        while start != -1:
+            spans.append((start, start + len(token)))
+            start = word.find(token, start + 1)
+        if not spans and word in expansions.get(token, ()):
+            spans.append((0, len(word)))
+        return spans
+
+    def highlights(self, query: SearchQuery, doc_id: int) -> List[Tuple[int, int, str]]:
+        """(start, end, token) spans of query matches in the original, diacritized ayah text.
+
+        Offsets are code point indexes into the text as served. Phrases are
+        only highlighted where the whole phrase occurs; ayahs that matched
+        through their tafsir alone have no spans.
+        """
+        text = self.corpus.ayah_text(doc_id)
+        normalized, starts, ends = normalize_with_offsets(text)
+        words = [(m.start(), m.group()) for m in _WORD_RE.finditer(normalized)]
+        expansions = self.expansions(query)
+        found: Set[Tuple[int, int, str]] = set()
+
+        def mark(position: int, token: str, word_spans: List[Tuple[int, int]]):
+            offset = words[position][0]
+            for start, end in word_spans:
+                found.add((starts[offset + start], ends[offset + end - 1], token))
+
+        single_tokens = list(query.terms)
+        for left, right, _ in query.near:
+            single_tokens.extend((left, right))
+        for token in single_tokens:
+            for position, (_, word) in enumerate(words):
+                mark(position, token, self._word_spans(query, token, word, expansions))
+
+        for phrase in query.phrases:
+            for first in range(len(words) - len(phrase) + 1):
+                matches = [self._word_spans(query, token, words[first + i][1], expansions)
+                           for i, token in enumerate(phrase)]
+                if all(matches):
+                    for i, token in enumerate(phrase):
+                        mark(first + i, token, matches[i])
+
+        return sorted(found)
+
+    def ranked(self, query: SearchQuery, offset: int, limit: int) -> Tuple[List[int], int]:
+        """One page of ayah doc ids by descending relevance, plus the total number of matches.
+
+        Only the top offset+limit matches are ordered (heap selection); ties
+        fall back to corpus order so pages are stable.
+        """
+        scores = self.search(query)
+        top = heapq.nsmallest(offset + limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [doc_id for doc_id, _ in top[offset:]], len(scores)
+
+    def iter_matches(self, query: SearchQuery) -> Iterator[int]:
+        """Matching ayah doc ids in corpus order, produced lazily (unranked)"""
+        sources: List[Iterable[int]] = []
+        if 'ar' in query.langs:
+            sources.extend(self._arabic_matches(query))
+        for lang in query.langs:
+            if lang in self.translation_indexes:
+                sources.append(self.translation_indexes[lang].iter_docs(query.translation_terms))
+
+        last = None
+        for doc_id in heapq.merge(*sources):
+            if doc_id != last:
+                last = doc_id
+                yield doc_id
+
+    def _arabic_matches(self, query: SearchQuery) -> List[Iterable[int]]:
+        """Sorted doc id streams whose union is the Arabic (text or tafsir) matches"""
+        tokens = query.tokens
+        if query.mode == 'root':
+            return [self.root_index.iter_docs(tokens)]
+
+        if query.positional:
+            # Positional constraints are selective; check all candidates in one pass
+            return [sorted(self.ayah_index.filter_positional(query, set(self.ayah_index.iter_docs(tokens))))]
+
+        # Tafsir ids are laid out in ayah order, so owners come out sorted too
+        expansions = self.expansions(query)
+        tafsir_owners = (self.tafsir_owner[t] for t in self.tafsir_index.iter_docs(tokens, expansions))
+        return [self.ayah_index.iter_docs(tokens, expansions), tafsir_owners]
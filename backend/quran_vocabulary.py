@@ -0,0 +1,133 @@
+"""
+Vocabulary structures over the distinct normalized words of the corpus.
+
+Used for typo-tolerant search (a misspelled query token is expanded to
+the vocabulary words within a small edit distance, and those words then
+go through the regular inverted index) and for prefix autocomplete.
+"""
+
+import heapq
+from bisect import bisect_left
+from functools import lru_cache, partial
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+# Expanded tokens kept per vocabulary (typos repeat as much as queries do)
+EXPANSION_CACHE_SIZE = 4096
+
+# Completed prefixes kept per suggester; short prefixes have the widest
+# ranges and are also the most requested, one keystroke in
+COMPLETION_CACHE_SIZE = 4096
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance (insert/delete/substitute) between two strings"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def fuzzy_distance(token: str) -> int:
+    """Edit budget for a query token: none for short words, 2 only for long ones"""
+    if len(token) <= 3:
+        return 0
+    if len(token) <= 7:
+        return 1
+    return 2
+
+
+def _deletes(word: str, depth: int) -> Set[str]:
+    """The word plus every string reachable by deleting up to `depth` characters"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {v[:i] + v[i + 1:] for v in frontier for i in range(len(v))}
+        variants |= frontier
+    return variants
+
+
+class FuzzyVocabulary:
+    """Symmetric-delete index for nearest-word lookups under edit distance.
+
+    Every vocabulary word is stored under its deletion variants; two words
+    are within distance k only if they share a variant with at most k
+    deletions on each side, so a lookup is a few dozen dictionary probes
+    plus verification of the (few) candidates. Pure-Python BK-tree and
+    trie walks were an order of magnitude slower on a vocabulary this size.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.words: List[str] = sorted(set(words))
+        # deletion variant -> word id, or list of word ids when shared
+        self._variants: Dict[str, Union[int, List[int]]] = {}
+        for word_id, word in enumerate(self.words):
+            # Distance 2 is only used for tokens of 8+ characters, which can
+            # only reach words of 6+ characters
+            for variant in _deletes(word, 2 if len(word) >= 6 else 1):
+                existing = self._variants.get(variant)
+                if existing is None:
+                    self._variants[variant] = word_id
+                elif isinstance(existing, int):
+                    self._variants[variant] = [existing, word_id]
+                else:
+                    existing.append(word_id)
+        # (distance, word) pairs within a token's edit budget, closest first.
+        # Cached over the word tables rather than a bound method, which
+        # would tie the instance into a reference cycle
+        self.similar = lru_cache(maxsize=EXPANSION_CACHE_SIZE)(partial(_similar, self.words, self._variants))
+
+
+def _similar(words: List[str], variants: Dict[str, Union[int, List[int]]], token: str) -> Tuple[Tuple[int, str], ...]:
+    max_distance = fuzzy_distance(token)
+    candidates: Set[int] = set()
+    for variant in _deletes(token, max_distance):
+        found = variants.get(variant)
+        if found is None:
+            continue
+        if isinstance(found, int):
+            candidates.add(found)
+        else:
+            candidates.update(found)
+
+    matches = []
+    for word_id in candidates:
+        word = words[word_id]
+        distance = levenshtein(token, word)
+        if distance <= max_distance:
+            matches.append((distance, word))
+    matches.sort()
+    return tuple(matches)
+
+
+class PrefixSuggester:
+    """Top-N completions of a prefix from a sorted vocabulary.
+
+    All words sharing a prefix form one contiguous slice of the sorted
+    array, found with two binary searches; the slice is then ranked by
+    word frequency.
+    """
+
+    def __init__(self, frequencies: Dict[str, int]):
+        self.words: List[str] = sorted(frequencies)
+        self.counts: List[int] = [frequencies[word] for word in self.words]
+        # (word, count) for the most frequent words starting with a prefix
+        self.complete = lru_cache(maxsize=COMPLETION_CACHE_SIZE)(partial(_complete, self.words, self.counts))
+
+
+def _complete(words: List[str], counts: List[int], prefix: str, limit: int) -> Tuple[Tuple[str, int], ...]:
+    if not prefix:
+        return ()
+    start = bisect_left(words, prefix)
+    # Every word with the prefix sorts before prefix + the highest code point
+    stop = bisect_left(words, prefix + '\U0010ffff', lo=start)
+    best = heapq.nsmallest(limit, range(start, stop), key=lambda i: (-counts[i], words[i]))
+    return tuple((words[i], counts[i]) for i in best)
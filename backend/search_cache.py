@@ -0,0 +1,118 @@
+"""
+Result cache for /api/quran/search.
+
+Entries are the rendered JSON response bytes, so a hit skips the search,
+the SearchResult models and JSON encoding. The default backend is an
+in-process LRU with a TTL; set SEARCH_CACHE_URL=redis://... to share one
+cache between workers (requires the optional `redis` package).
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """Size-bounded LRU with per-entry expiry, local to one worker"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[str, Tuple[float, bytes]]' = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Redis-backed cache shared by every worker pointing at the same server"""
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = 'quran_search:'):
+        import redis.asyncio as redis  # optional dependency
+
+        self.client = redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes):
+        await self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl_seconds)))
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class SearchCache:
+    """Counts hits and misses around a pluggable cache backend.
+
+    Backend failures are logged and treated as misses so the cache can never
+    take search down with it.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, url: Optional[str], max_entries: int, ttl_seconds: float) -> 'SearchCache':
+        """Redis backend when a URL is configured and usable, in-process LRU otherwise"""
+        if url:
+            try:
+                return cls(RedisCacheBackend(url, ttl_seconds))
+            except ImportError:
+                logger.warning("SEARCH_CACHE_URL is set but the redis package is not installed; using in-process cache")
+        return cls(MemoryCacheBackend(max_entries, ttl_seconds))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Search cache get failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes):
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"Search cache set failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": self.backend.size(),
+            "evictions": getattr(self.backend, 'evictions', None),
+        }
@@ -0,0 +1,140 @@
+"""
+Process pool for Qur'an searches.
+
+Searching is pure Python, so it holds the GIL and, run inside an endpoint,
+blocks the event loop (and every azkar/charity request behind it) until it
+finishes. With SEARCH_WORKERS > 0 searches run in forked worker processes
+instead: the workers are forked right after the index is built, so they
+inherit it, and the memory-mapped corpus, copy-on-write rather than
+building their own. Concurrent searches then use several cores.
+"""
+
+import asyncio
+import gc
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import dropwhile, islice
+from typing import AsyncIterator, List, Optional, Tuple
+
+from quran_index import QuranSearchIndex, SearchQuery
+
+logger = logging.getLogger(__name__)
+
+# Index used by worker processes; set in the parent before forking so every
+# worker inherits it
+_WORKER_INDEX: Optional[QuranSearchIndex] = None
+
+
+def _ranked(query: SearchQuery, offset: int, limit: int) -> Tuple[List[int], int]:
+    return _WORKER_INDEX.ranked(query, offset, limit)
+
+
+def _matches(query: SearchQuery, after: Optional[int], limit: int) -> List[int]:
+    return list(islice(_matches_after(_WORKER_INDEX, query, after), limit))
+
+
+def _matches_after(index: QuranSearchIndex, query: SearchQuery, after: Optional[int]):
+    matches = index.iter_matches(query)
+    return matches if after is None else dropwhile(lambda doc_id: doc_id <= after, matches)
+
+
+def _ready() -> bool:
+    return _WORKER_INDEX is not None
+
+
+class SearchPool:
+    """Runs searches in forked workers, or inline when the pool is disabled.
+
+    Root-mode queries are plain dictionary lookups and always run inline;
+    shipping them to a worker would cost more than answering them.
+    """
+
+    def __init__(self, index: QuranSearchIndex, workers: int):
+        self.index = index
+        self.workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        if workers <= 0:
+            return
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            logger.warning("SEARCH_WORKERS is set but fork is unavailable on this platform; searching inline")
+            return
+
+        global _WORKER_INDEX
+        _WORKER_INDEX = index
+        # Exempt everything allocated so far, the index included, from cyclic
+        # GC: otherwise each worker's collector writes to the header of every
+        # container it scans, and copy-on-write copies the whole index into it
+        gc.collect()
+        gc.freeze()
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+        # With fork, the first submit starts every worker, so they are all forked
+        # now, from this index, rather than lazily under load
+        self.executor.submit(_ready).result()
+        logger.info(f"Started {workers} search worker processes")
+
+    def offloads(self, query: SearchQuery) -> bool:
+        """True if this query runs in a worker process"""
+        return self.executor is not None and query.mode != 'root'
+
+    async def _run(self, fn, *args):
+        """fn(*args) in a worker, or None if the caller should search inline instead"""
+        executor = self.executor
+        if executor is None:
+            return None
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); keep serving inline
+            logger.error("Search worker pool is broken; searching inline from now on")
+            self.executor = None
+            return None
+        except RuntimeError:
+            # Shut down by a reload after this request picked the pool up; its
+            # index is still in memory, so finish the search inline
+            return None
+
+    async def ranked(self, query: SearchQuery, offset: int, limit: int) -> Tuple[List[int], int]:
+        """QuranSearchIndex.ranked, off the event loop when the pool is enabled"""
+        if self.offloads(query):
+            result = await self._run(_ranked, query, offset, limit)
+            if result is not None:
+                return result
+        return self.index.ranked(query, offset, limit)
+
+    async def iter_matches(self, query: SearchQuery, limit: Optional[int], first_chunk: int) -> AsyncIterator[int]:
+        """Up to `limit` matching doc ids in corpus order.
+
+        Offloaded queries are fetched from the workers in chunks, each
+        resuming after the last doc id of the previous one and twice its
+        size, so the first matches arrive without waiting for the whole
+        match list and re-walking the skipped matches costs O(log n) passes.
+        """
+        after: Optional[int] = None
+        remaining = limit
+        chunk = first_chunk
+        while self.offloads(query) and (remaining is None or remaining > 0):
+            size = chunk if remaining is None else min(chunk, remaining)
+            doc_ids = await self._run(_matches, query, after, size)
+            if doc_ids is None:
+                break
+            for doc_id in doc_ids:
+                yield doc_id
+            if len(doc_ids) < size:
+                return
+            after = doc_ids[-1]
+            if remaining is not None:
+                remaining -= size
+            chunk *= 2
+        if remaining == 0:
+            return
+        # Inline, or the rest inline when the pool went away mid-stream
+        for doc_id in islice(_matches_after(self.index, query, after), remaining):
+            yield doc_id
+
+    def shutdown(self, cancel_pending: bool = True, wait: bool = False):
+        """Stop the workers; with cancel_pending=False queued searches still complete first"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+            self.executor = None
@@ -1,20 +1,44 @@
-from fastapi import FastAPI, APIRouter, Query, HTTPException
+from fastapi import FastAPI, APIRouter, Query, HTTPException, Request, Response, Header
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 import uuid
 from datetime import datetime
 import pytz
 import json
+import base64
+import asyncio
+import hmac
+import gc
+import calendar
+import time
+from quran_corpus import TRANSLATION_LANGUAGES, QuranCorpus, write_corpus_file
+from quran_index import SEARCH_LANGUAGES, SEARCH_MODES, QuranSearchIndex, SearchQuery, parse_search_query
+from search_cache import SearchCache
+from search_pool import SearchPool
+from mongo_indexes import ensure_indexes
+from daily_rollups import ROLLUP_KINDS, DailyRollups
+from entry_sync import changes_since, ensure_sequenced, stamped_writes
+from static_responses import PrerenderedJSON
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
 def get_user_timezone_now(timezone_name: str = None):
     """Get current time in user's timezone or UTC if not provided"""
     try:
@@ -45,11 +69,83 @@ def create_timestamp_from_client(client_timestamp: str = None, timezone_name: st
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
+ROLLUPS = DailyRollups(db)
+
+# Load the Qur'an corpus once at startup. The binary corpus built by
+# build_quran_corpus.py is memory-mapped so workers share its pages;
+# quran_data.json is only parsed when no up-to-date build exists.
+QURAN_JSON_PATH = Path(os.environ.get('QURAN_DATA_PATH', ROOT_DIR / 'quran_data.json'))
+QURAN_CORPUS_PATH = Path(os.environ.get('QURAN_CORPUS_PATH', ROOT_DIR / 'quran_corpus.bin'))
+
+def load_quran_corpus(rebuild_stale: bool = False) -> QuranCorpus:
+    """Memory-map the prebuilt corpus, falling back to quran_data.json when
+    the build is missing, unreadable or older than the JSON; with
+    rebuild_stale, an older build is rebuilt from the JSON instead"""
+    if not QURAN_CORPUS_PATH.exists():
+        logger.warning(f"{QURAN_CORPUS_PATH.name} not found, loading {QURAN_JSON_PATH.name}; run build_quran_corpus.py")
+    elif QURAN_JSON_PATH.exists() and QURAN_JSON_PATH.stat().st_mtime > QURAN_CORPUS_PATH.stat().st_mtime:
+        if rebuild_stale:
+            return rebuild_quran_corpus()
+        # Serving the build would serve the text from before the JSON was edited
+        logger.warning(f"{QURAN_CORPUS_PATH.name} is older than {QURAN_JSON_PATH.name}, loading {QURAN_JSON_PATH.name}; run build_quran_corpus.py")
+    else:
+        try:
+            return QuranCorpus.open(QURAN_CORPUS_PATH)
+        except ValueError as e:
+            # Typically a file built by an older version of the format
+            logger.warning(f"Cannot use {QURAN_CORPUS_PATH.name} ({e}), loading {QURAN_JSON_PATH.name}; run build_quran_corpus.py")
+
+    with open(QURAN_JSON_PATH, 'r', encoding='utf-8') as f:
+        return QuranCorpus.from_json(json.load(f))
+
+def rebuild_quran_corpus() -> QuranCorpus:
+    """Compile quran_data.json into quran_corpus.bin and map it, or serve the
+    parsed JSON when the file cannot be written"""
+    with open(QURAN_JSON_PATH, 'r', encoding='utf-8') as f:
+        quran_data = json.load(f)
+    try:
+        write_corpus_file(quran_data, QURAN_CORPUS_PATH)
+    except OSError as e:
+        logger.warning(f"Cannot write {QURAN_CORPUS_PATH.name} ({e}), serving {QURAN_JSON_PATH.name}")
+        return QuranCorpus.from_json(quran_data)
+    logger.info(f"Rebuilt {QURAN_CORPUS_PATH.name} from {QURAN_JSON_PATH.name}")
+    return QuranCorpus.open(QURAN_CORPUS_PATH)
+
+# Searches run in forked worker processes so they neither block the event loop
+# nor queue behind each other; SEARCH_WORKERS=0 searches inline
+SEARCH_WORKERS = int(os.environ.get('SEARCH_WORKERS', 2))
 
-# Load Qur'an data once at startup (from local JSON)
-QURAN_JSON_PATH = ROOT_DIR / 'quran_data.json'
-with open(QURAN_JSON_PATH, 'r', encoding='utf-8') as f:
-    QURAN_DATA = json.load(f)
+class QuranState:
+    """One loaded corpus and everything derived from it.
+
+    A reload builds a new state and replaces the QURAN global in a single
+    assignment. Handlers read QURAN once per request, so a request that
+    started before a reload finishes on the version it started with.
+    """
+
+    def __init__(self, corpus: QuranCorpus):
+        self.corpus = corpus
+        self.version = corpus.digest
+        # Inverted index over normalized ayah text and tafsir, built once so searches only touch candidate ayahs
+        self.index = QuranSearchIndex(corpus)
+        # Static catalog responses are rendered (and compressed) once and served with an ETag
+        self.surahs_response = PrerenderedJSON(corpus.surahs)
+        self.pool: Optional[SearchPool] = None
+
+    def start_pool(self, workers: int):
+        """Fork the search workers once the state is built; blocks until they are all up"""
+        self.pool = SearchPool(self.index, workers)
+
+QURAN = QuranState(load_quran_corpus())
+QURAN.start_pool(SEARCH_WORKERS)
+QURAN_RELOAD_LOCK = asyncio.Lock()
+
+# Rendered responses for repeated searches; SEARCH_CACHE_URL=redis://... shares it between workers
+SEARCH_CACHE = SearchCache.from_settings(
+    os.environ.get('SEARCH_CACHE_URL'),
+    max_entries=int(os.environ.get('SEARCH_CACHE_SIZE', 2048)),
+    ttl_seconds=float(os.environ.get('SEARCH_CACHE_TTL', 300)),
+)
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -71,7 +167,37 @@ class SurahMeta(BaseModel):
     nameAr: str
     nameEn: str
 
-class SearchResult(BaseModel):
+class AyahText(BaseModel):
+    ayah: int
+    textAr: str
+    en: Optional[str] = None
+    es: Optional[str] = None
+    tafseer: Optional[str] = None
+
+class SurahVerses(BaseModel):
+    surahNumber: int
+    nameAr: str
+    nameEn: str
+    ayahs: List[AyahText]
+
+class VerseRange(BaseModel):
+    surah: int
+    from_ayah: int = 1
+    to_ayah: Optional[int] = None  # Defaults to the end of the surah
+
+class VerseRangeRequest(BaseModel):
+    ranges: List[VerseRange]
+    bilingual: Optional[str] = None  # "en", "es", or "tafseer" to include a translation or the first tafseer per ayah
+
+# Upper bound on ayahs returned by one bulk verse request
+MAX_BULK_AYAHS = 1000
+
+class Highlight(BaseModel):
+    start: int  # code point offsets into textAr, diacritics included
+    end: int
+    token: str  # normalized query token that matched
+
+class Ayah(BaseModel):
     surahNumber: int
     nameAr: str
     nameEn: str
@@ -81,6 +207,17 @@ class SearchResult(BaseModel):
     es: Optional[str] = None
     tafseer: Optional[str] = None
 
+class SearchResult(Ayah):
+    highlights: List[Highlight]
+
+class WordSuggestion(BaseModel):
+    word: str
+    count: int  # occurrences in the ayah text
+
+class SuggestResponse(BaseModel):
+    words: List[WordSuggestion]
+    surahs: List[SurahMeta]
+
 # Health/basic routes
 @api_router.get("/")
 async def root():
@@ -100,67 +237,269 @@ async def get_status_checks():
 
 # Quran endpoints
 @api_router.get('/quran/surahs', response_model=List[SurahMeta])
-async def list_surahs():
-    metas: List[SurahMeta] = [
-        SurahMeta(number=s['number'], nameAr=s['surah'], nameEn=s.get('nameEn', f"Surah {s['number']}"))
-        for s in QURAN_DATA['surahs']
-    ]
-    return metas
+async def list_surahs(request: Request):
+    return QURAN.surahs_response.response(request)
+
+def encode_search_cursor(offset: int) -> str:
+    """Opaque continuation token for the next page of search results"""
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str) -> int:
+    """Offset encoded in a search cursor; 400 if the cursor is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, offset = raw.split(":", 1)
+        if prefix != "o" or int(offset) < 0:
+            raise ValueError(raw)
+        return int(offset)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def bilingual_fields(corpus: QuranCorpus, doc_id: int, bilingual: Optional[str]) -> dict:
+    """en/es/tafseer values for one ayah: only the requested one is set, and None when the corpus has none"""
+    fields = {'en': None, 'es': None, 'tafseer': None}
+    if bilingual in TRANSLATION_LANGUAGES:
+        fields[bilingual] = corpus.ayah_translation(doc_id, bilingual)
+    elif bilingual == 'tafseer':
+        # Bodies load lazily through an LRU cache
+        tafsir = corpus.tafsir(corpus.ayah_surah(doc_id)['number'], corpus.ayah_number(doc_id))
+        fields['tafseer'] = tafsir[0] if tafsir else None
+    return fields
+
+def build_search_result(state: QuranState, doc_id: int, bilingual: Optional[str], search_query: SearchQuery) -> SearchResult:
+    """SearchResult for one ayah doc id, with the query's matches in textAr highlighted"""
+    corpus = state.corpus
+    s = corpus.ayah_surah(doc_id)
+    return SearchResult(
+        surahNumber=s['number'],
+        nameAr=s['nameAr'],
+        nameEn=s['nameEn'],
+        ayah=corpus.ayah_number(doc_id),
+        textAr=corpus.ayah_text(doc_id),
+        **bilingual_fields(corpus, doc_id, bilingual),
+        highlights=[
+            Highlight(start=start, end=end, token=token)
+            for start, end, token in state.index.highlights(search_query, doc_id)
+        ],
+    )
+
+# Streamed results yield to the event loop after this many lines
+STREAM_BATCH_SIZE = 50
+
+async def stream_search_results(state: QuranState, search_query: SearchQuery, bilingual: Optional[str], limit: Optional[int]):
+    """NDJSON lines, one SearchResult per line, as matches are found in corpus order"""
+    count = 0
+    async for doc_id in state.pool.iter_matches(search_query, limit, STREAM_BATCH_SIZE):
+        line = json.dumps(build_search_result(state, doc_id, bilingual, search_query).dict(), ensure_ascii=False, separators=(",", ":"))
+        yield (line + "\n").encode("utf-8")
+        count += 1
+        if count % STREAM_BATCH_SIZE == 0:
+            await asyncio.sleep(0)
 
 @api_router.get('/quran/search')
 async def quran_search(
-    query: str = Query(..., description="Search term in Arabic or translations"),
-    bilingual: Optional[str] = Query(None, description="en, es, or tafseer to include interpretation snippet")
+    query: str = Query(..., description='Search terms in Arabic or translations; "quoted phrase" and a NEAR/k b are supported'),
+    bilingual: Optional[str] = Query(None, description="en, es, or tafseer to include interpretation snippet"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Maximum number of results per page (default 100; unbounded when streaming)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    stream: bool = Query(False, description="Stream every match as NDJSON in corpus order instead of a ranked page"),
+    mode: str = Query('text', description="text (literal match), root (match words sharing an Arabic root) or fuzzy (also match near-miss spellings)"),
+    lang: str = Query('ar', description="Comma-separated texts to search: ar (ayah text and tafsir), en, es"),
 ):
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(SEARCH_MODES)}")
+    requested = {part.strip() for part in lang.split(',') if part.strip()}
+    if not requested or requested - set(SEARCH_LANGUAGES):
+        raise HTTPException(status_code=400, detail=f"lang must be a comma-separated list of {', '.join(SEARCH_LANGUAGES)}")
+    langs = tuple(l for l in SEARCH_LANGUAGES if l in requested)
+    offset = decode_search_cursor(cursor) if cursor else 0
+
     q = query.strip()
     if not q:
-        return {"results": []}
+        return {"results": [], "total": 0, "next_cursor": None}
 
-    # Tokenize simple words, require all tokens present (AND search)
-    tokens = [t for t in q.split() if t]
+    # Every step of this request uses the corpus version current at its start
+    state = QURAN
 
-    results: List[SearchResult] = []
-    for s in QURAN_DATA['surahs']:
-        for a in s['ayahs']:
-            hay_ar = a['text']  # Updated field name
-            
-            # Search in Arabic text
-            match_ar = all(tok in hay_ar for tok in tokens)
-            
-            # Search in tafseer if available
-            match_tafseer = False
-            tafseer_text = ""
-            if 'tafsir' in a and a['tafsir']:
-                for tafsir_item in a['tafsir']:
-                    tafsir_text = tafsir_item.get('text', '')
-                    if tafsir_text and all(tok in tafsir_text for tok in tokens):
-                        match_tafseer = True
-                        break
-            
-            if match_ar or match_tafseer:
-                # Get the first tafseer text for display if requested
-                first_tafseer = ""
-                if bilingual == 'tafseer' and 'tafsir' in a and a['tafsir']:
-                    first_tafseer = a['tafsir'][0].get('text', '') if a['tafsir'] else ""
-                
-                res = SearchResult(
-                    surahNumber=s['number'],
-                    nameAr=s['surah'],
-                    nameEn=s.get('nameEn', f"Surah {s['number']}"),
-                    ayah=a['ayah_number'], # Updated field name
-                    textAr=a['text'],     # Updated field name
-                    en=None,  # No English translation in this dataset
-                    es=None,  # No Spanish translation in this dataset
-                    tafseer=first_tafseer,
-                )
-                results.append(res)
-                # Limit for performance
-                if len(results) >= 100:
-                    break
-        if len(results) >= 100:
-            break
-
-    return {"results": [r.dict() for r in results]}
+    # Normalize once (tashkeel, alef/ta-marbuta/ya folds; case/accent folds for translations)
+    # and require all tokens present (AND search)
+    search_query = parse_search_query(q, mode, langs)
+    if search_query.empty:
+        return {"results": [], "total": 0, "next_cursor": None}
+
+    if stream:
+        return StreamingResponse(stream_search_results(state, search_query, bilingual, limit), media_type="application/x-ndjson")
+
+    limit = limit or 100
+
+    # Cached responses skip the search, the SearchResult models and JSON encoding
+    cache_key = f"{state.version}|{search_query.cache_key()}|{bilingual or ''}|{offset}|{limit}"
+    cached = await SEARCH_CACHE.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    # BM25-ranked page; only the top offset+limit matches are ordered
+    page, total = await state.pool.ranked(search_query, offset, limit)
+
+    results = [build_search_result(state, doc_id, bilingual, search_query) for doc_id in page]
+
+    next_offset = offset + len(page)
+    body = json.dumps({
+        "results": [r.dict() for r in results],
+        "total": total,
+        "next_cursor": encode_search_cursor(next_offset) if next_offset < total else None
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    await SEARCH_CACHE.set(cache_key, body)
+    return Response(content=body, media_type="application/json")
+
+@api_router.get('/quran/cache/stats')
+async def quran_search_cache_stats():
+    """Hit/miss counters for the search result cache"""
+    return SEARCH_CACHE.stats()
+
+def surah_verses(corpus: QuranCorpus, surah_number: int, docs: range, bilingual: Optional[str]) -> SurahVerses:
+    """Build one surah slice from a contiguous range of ayah doc ids"""
+    s = corpus.surahs[corpus.surah_index(surah_number)]
+    ayahs = [
+        AyahText(ayah=corpus.ayah_number(doc_id), textAr=corpus.ayah_text(doc_id), **bilingual_fields(corpus, doc_id, bilingual))
+        for doc_id in docs
+    ]
+    return SurahVerses(surahNumber=s['number'], nameAr=s['nameAr'], nameEn=s['nameEn'], ayahs=ayahs)
+
+@api_router.get('/quran/surah/{surah_number}', response_model=SurahVerses)
+async def get_surah(
+    surah_number: int,
+    from_ayah: int = Query(1, ge=1, description="First ayah to return"),
+    to_ayah: Optional[int] = Query(None, ge=1, description="Last ayah to return (default: end of surah)"),
+    bilingual: Optional[str] = Query(None, description="en, es, or tafseer to include a translation or the first tafseer per ayah")
+):
+    """Get a surah, or a range of its ayahs, via the (surah, ayah) offset table"""
+    corpus = QURAN.corpus
+    try:
+        docs = corpus.ayah_range(surah_number, from_ayah, to_ayah)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Surah not found")
+    return surah_verses(corpus, surah_number, docs, bilingual)
+
+@api_router.get('/quran/ayah/{surah_number}/{ayah_number}', response_model=Ayah)
+async def get_ayah(
+    surah_number: int,
+    ayah_number: int,
+    bilingual: Optional[str] = Query(None, description="en, es, or tafseer to include a translation or the first tafseer")
+):
+    """Get a single ayah"""
+    corpus = QURAN.corpus
+    try:
+        doc_id = corpus.ayah_doc(surah_number, ayah_number)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Ayah not found")
+
+    s = corpus.ayah_surah(doc_id)
+    return Ayah(
+        surahNumber=s['number'],
+        nameAr=s['nameAr'],
+        nameEn=s['nameEn'],
+        ayah=ayah_number,
+        textAr=corpus.ayah_text(doc_id),
+        **bilingual_fields(corpus, doc_id, bilingual),
+    )
+
+@api_router.get('/quran/suggest', response_model=SuggestResponse)
+async def suggest(
+    prefix: str = Query(..., description="What the user has typed so far; the last word is completed"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum words (and surahs) to return"),
+):
+    """Autocomplete Quran words by corpus frequency, plus matching surah names"""
+    words, surahs = QURAN.index.suggest(prefix, limit)
+    return SuggestResponse(
+        words=[WordSuggestion(word=word, count=count) for word, count in words],
+        surahs=[SurahMeta(**s) for s in surahs],
+    )
+
+@api_router.post('/quran/verses')
+async def get_verse_ranges(request: VerseRangeRequest):
+    """Get several verse ranges in one request, in the order they were asked for"""
+    corpus = QURAN.corpus
+    slices = []
+    for verse_range in request.ranges:
+        try:
+            slices.append((verse_range.surah, corpus.ayah_range(verse_range.surah, verse_range.from_ayah, verse_range.to_ayah)))
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Surah {verse_range.surah} not found")
+
+    if sum(len(docs) for _, docs in slices) > MAX_BULK_AYAHS:
+        raise HTTPException(status_code=400, detail=f"Too many ayahs requested (max {MAX_BULK_AYAHS})")
+
+    return {"ranges": [surah_verses(corpus, surah_number, docs, request.bilingual).dict() for surah_number, docs in slices]}
+
+def require_admin_token(token: Optional[str]):
+    """403 unless ADMIN_TOKEN is configured, 401 unless the request carries it"""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not token or not hmac.compare_digest(token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@api_router.post('/admin/quran/reload')
+async def reload_quran(x_admin_token: Optional[str] = Header(None)):
+    """Load quran_corpus.bin / quran_data.json again and swap the new version in.
+
+    After editing quran_data.json, call this directly: a quran_corpus.bin
+    older than the JSON is rebuilt from it before loading.
+
+    Loading, indexing and starting the search workers run in threads, so
+    the event loop keeps serving (on the old version) meanwhile. Affects the
+    worker process that handles the request; with several uvicorn workers,
+    repeat per worker.
+    """
+    global QURAN
+    require_admin_token(x_admin_token)
+    if QURAN_RELOAD_LOCK.locked():
+        raise HTTPException(status_code=409, detail="A reload is already in progress")
+
+    async with QURAN_RELOAD_LOCK:
+        started = time.monotonic()
+        previous = QURAN
+        # An edited quran_data.json is compiled into quran_corpus.bin first, so
+        # this and every later startup map the new text
+        corpus = await asyncio.to_thread(load_quran_corpus, True)
+        if await asyncio.to_thread(lambda: corpus.digest) == previous.version:
+            return {"reloaded": False, "version": previous.version}
+
+        state = await asyncio.to_thread(QuranState, corpus)
+        # Forking, freezing the heap for GC and waiting for the workers all
+        # take a while with a full index in memory, so they stay off the loop
+        await asyncio.to_thread(state.start_pool, SEARCH_WORKERS)
+        QURAN = state
+        # Searches already queued on the old workers still complete
+        previous.pool.shutdown(cancel_pending=False)
+        # start_pool froze everything alive before forking, the previous version
+        # included; without unfreezing, the cyclic GC would never reclaim its
+        # garbage. Its corpus (and mmap) goes once the last request using it ends.
+        gc.unfreeze()
+
+        seconds = round(time.monotonic() - started, 3)
+        logger.info(f"Reloaded Qur'an corpus {previous.version} -> {state.version} in {seconds}s")
+        return {
+            "reloaded": True,
+            "version": state.version,
+            "previous_version": previous.version,
+            "surahs": corpus.surah_count,
+            "ayahs": corpus.ayah_count,
+            "seconds": seconds,
+        }
+
+@api_router.post('/admin/rollups/rebuild')
+async def rebuild_rollups(x_admin_token: Optional[str] = Header(None)):
+    """Recompute the daily azkar/charity rollups from the raw entries"""
+    require_admin_token(x_admin_token)
+    started = time.monotonic()
+    written = await ROLLUPS.rebuild_all()
+    if written is None:
+        raise HTTPException(status_code=409, detail="A rollup rebuild is already running")
+    seconds = round(time.monotonic() - started, 3)
+    logger.info(f"Rebuilt daily rollups {written} in {seconds}s")
+    return {"rebuilt": written, "seconds": seconds}
 
 # Azkar Models
 class ZikrEntry(BaseModel):
@@ -171,8 +510,11 @@ class ZikrEntry(BaseModel):
     date: str  # ISO date string (YYYY-MM-DD)
     timestamp: datetime = Field(default_factory=lambda: get_user_timezone_now())
     edit_notes: Optional[List[str]] = []  # Track edit history
+    seq: Optional[int] = None  # Per-user change sequence, set on every write (for /sync/changes)
+    updated_at: Optional[datetime] = None
 
 class ZikrEntryCreate(BaseModel):
+    id: Optional[str] = Field(None, min_length=1, max_length=128)  # Client-generated; resending the same id is a no-op
     zikr_id: int
     count: int
     date: str
@@ -202,8 +544,11 @@ class CharityEntry(BaseModel):
     timestamp: datetime = Field(default_factory=lambda: get_user_timezone_now())
     comments: Optional[str] = ""  # User comments/notes
     edit_notes: Optional[List[str]] = []  # Track edit history
+    seq: Optional[int] = None  # Per-user change sequence, set on every write (for /sync/changes)
+    updated_at: Optional[datetime] = None
 
 class CharityEntryCreate(BaseModel):
+    id: Optional[str] = Field(None, min_length=1, max_length=128)  # Client-generated; resending the same id is a no-op
     charity_id: int
     count: int
     date: str
@@ -224,6 +569,22 @@ class CharityStats(BaseModel):
     total_sessions: int
     last_entry: Optional[datetime] = None
 
+# Upper bound on entries accepted by one batch request
+MAX_BATCH_ENTRIES = 500
+
+class EntryBatch(BaseModel):
+    # Validated entry by entry, so one malformed entry does not reject the batch
+    entries: List[Dict[str, Any]]
+
+class BatchItemResult(BaseModel):
+    id: Optional[str] = None  # set when the entry was stored
+    replayed: bool = False  # an entry with this id was already stored; not counted again
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    inserted: int
+    results: List[BatchItemResult]  # one per submitted entry, in request order
+
 # Azkar data - this would typically come from a database
 AZKAR_LIST = [
     {"id": 1, "nameAr": "سبحان الله وبحمده", "nameEn": "Subhan Allah wa Bi Hamdih", "color": "#FF6B6B"},
@@ -277,15 +638,193 @@ CHARITY_LIST = [
     {"id": 32, "nameAr": "دفع إيجار بيت أسرة مسلمة فقيرة", "nameEn": "Pay Rent for a Poor Muslim Family", "nameEs": "Pagar el alquiler de una familia musulmana pobre", "color": "#CD853F", "description": "دفع إيجار المنازل للأسر الفقيرة"},
 ]
 
+AZKAR_RESPONSE = PrerenderedJSON({"azkar": AZKAR_LIST})
+CHARITIES_RESPONSE = PrerenderedJSON({"charities": CHARITY_LIST})
+
+async def item_totals(kind: str, match: dict) -> List[dict]:
+    """[{_id: item_id, count, sessions}] of the matching entries: read from the
+    daily rollups once they are built, grouped from the raw entries until then"""
+    if ROLLUPS.ready:
+        return await ROLLUPS.item_totals(kind, match["user_id"], match["date"])
+    collection, item_field = ROLLUP_KINDS[kind]
+    return await db[collection].aggregate([
+        {"$match": match},
+        {"$group": {"_id": f"${item_field}", "count": {"$sum": "$count"}, "sessions": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ]).to_list(None)
+
+async def summarize_entries(kind: str, match: dict) -> Tuple[Dict[int, dict], int]:
+    """Per-item count/sessions/percentage of the matching entries"""
+    groups = await item_totals(kind, match)
+
+    total = sum(group["count"] for group in groups)
+    summary = {
+        group["_id"]: {
+            "count": group["count"],
+            "sessions": group["sessions"],
+            "percentage": round((group["count"] / total) * 100, 1) if total > 0 else 0,
+        }
+        for group in groups
+    }
+    return summary, total
+
+async def find_entries(collection, match: dict) -> List[dict]:
+    """All matching entries, JSON-ready"""
+    entries = await collection.find(match).to_list(None)
+
+    # Convert ObjectId to string for JSON serialization
+    for entry in entries:
+        if "_id" in entry:
+            entry["_id"] = str(entry["_id"])
+    return entries
+
+async def entry_summary(kind: str, match: dict, include_entries: bool) -> Tuple[Dict[int, dict], int, Optional[List[dict]]]:
+    """Summary of the matching entries, plus the entries themselves when asked for"""
+    if not include_entries:
+        summary, total = await summarize_entries(kind, match)
+        return summary, total, None
+    (summary, total), entries = await asyncio.gather(
+        summarize_entries(kind, match),
+        find_entries(db[ROLLUP_KINDS[kind][0]], match),
+    )
+    return summary, total, entries
+
+async def day_item_totals(kind: str, match: dict) -> List[dict]:
+    """[{date, item_id, count, sessions}] of the matching entries, per day and item"""
+    if ROLLUPS.ready:
+        return await ROLLUPS.day_item_totals(kind, match["user_id"], match["date"])
+    collection, item_field = ROLLUP_KINDS[kind]
+    return await db[collection].aggregate([
+        {"$match": match},
+        {"$group": {"_id": {"date": "$date", "item_id": f"${item_field}"},
+                    "count": {"$sum": "$count"}, "sessions": {"$sum": 1}}},
+        {"$project": {"_id": 0, "date": "$_id.date", "item_id": "$_id.item_id", "count": 1, "sessions": 1}},
+    ]).to_list(None)
+
+async def month_calendar(kind: str, month: str) -> dict:
+    """Per-day totals of a YYYY-MM month as parallel arrays, one slot per day.
+
+    top_items holds each day's highest-count item id (lowest id on a tie),
+    or None on days without entries.
+    """
+    try:
+        first = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Month must be formatted as YYYY-MM")
+    days_in_month = calendar.monthrange(first.year, first.month)[1]
+    month = first.strftime("%Y-%m")
+
+    totals = [0] * days_in_month
+    sessions = [0] * days_in_month
+    top_items: List[Optional[int]] = [None] * days_in_month
+    top_counts = [0] * days_in_month
+    rows = await day_item_totals(kind, {
+        "date": {"$gte": f"{month}-01", "$lte": f"{month}-{days_in_month:02d}"},
+        "user_id": "default",
+    })
+    for row in rows:
+        if len(row["date"]) != 10 or not row["date"][8:].isdigit():
+            continue  # not a YYYY-MM-DD date
+        day = int(row["date"][8:]) - 1
+        totals[day] += row["count"]
+        sessions[day] += row["sessions"]
+        if top_items[day] is None or (row["count"], -row["item_id"]) > (top_counts[day], -top_items[day]):
+            top_items[day] = row["item_id"]
+            top_counts[day] = row["count"]
+
+    return {
+        "month": month,
+        "total": sum(totals),
+        "totals": totals,
+        "sessions": sessions,
+        "top_items": top_items,
+    }
+
+DUPLICATE_KEY_ERROR = 11000
+
+async def store_entry(kind: str, entry: BaseModel, response: Response) -> dict:
+    """Insert the entry unless one with its id is already stored, and return
+    the stored entry: the original one on a replay, flagged by an
+    Idempotent-Replayed header"""
+    collection, item_field = ROLLUP_KINDS[kind]
+    doc = entry.dict()
+    key = {"user_id": doc["user_id"], "id": doc["id"]}
+    async with stamped_writes(db, doc["user_id"], [doc]):
+        try:
+            # Upsert on the unique (user_id, id) index: the document from before
+            # the update is None exactly when this request inserted it
+            existing = await db[collection].find_one_and_update(
+                key, {"$setOnInsert": doc}, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # A concurrent request with the same id inserted it first
+            existing = await db[collection].find_one(key)
+    if existing is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return existing
+
+    await ROLLUPS.record(kind, doc["user_id"], doc[item_field], doc["date"], doc["count"], 1)
+    return doc
+
+def client_entry_id(entry: BaseModel, idempotency_key: Optional[str]):
+    """Use the Idempotency-Key header as the entry id when the body has none"""
+    if idempotency_key is None:
+        return
+    if entry.id is not None and entry.id != idempotency_key:
+        raise HTTPException(status_code=400, detail="Idempotency-Key does not match the entry id")
+    entry.id = idempotency_key
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+async def insert_entry_batch(kind: str, batch: EntryBatch, create_model: Type[BaseModel], build: Callable) -> BatchResult:
+    """Validate and build each entry, store them with one unordered insert_many,
+    and add the stored ones to the daily rollups"""
+    if len(batch.entries) > MAX_BATCH_ENTRIES:
+        raise HTTPException(status_code=400, detail=f"Too many entries (max {MAX_BATCH_ENTRIES})")
+
+    results = [BatchItemResult() for _ in batch.entries]
+    docs, positions = [], []
+    for position, raw_entry in enumerate(batch.entries):
+        try:
+            docs.append(build(create_model.model_validate(raw_entry)).dict())
+        except ValidationError as e:
+            results[position].error = validation_message(e)
+            continue
+        positions.append(position)
+
+    failed = set()
+    if docs:
+        try:
+            async with stamped_writes(db, "default", docs):
+                await db[ROLLUP_KINDS[kind][0]].insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything but the entries listed here was inserted
+            for write_error in e.details.get("writeErrors", []):
+                failed.add(write_error["index"])
+                result = results[positions[write_error["index"]]]
+                if write_error.get("code") == DUPLICATE_KEY_ERROR:
+                    # (user_id, id) is unique: a retry of an entry already stored
+                    result.id = docs[write_error["index"]]["id"]
+                    result.replayed = True
+                else:
+                    result.error = write_error.get("errmsg", "Write failed")
+
+    inserted = []
+    for n, doc in enumerate(docs):
+        if n not in failed:
+            results[positions[n]].id = doc["id"]
+            inserted.append(doc)
+    await ROLLUPS.record_many(kind, inserted)
+    return BatchResult(inserted=len(inserted), results=results)
+
 # Azkar endpoints
 @api_router.get("/azkar")
-async def get_azkar_list():
+async def get_azkar_list(request: Request):
     """Get the list of available azkar"""
-    return {"azkar": AZKAR_LIST}
+    return AZKAR_RESPONSE.response(request)
 
-@api_router.post("/azkar/entry", response_model=ZikrEntry)
-async def create_zikr_entry(entry: ZikrEntryCreate):
-    """Record a zikr entry with user's device timestamp"""
+def build_zikr_entry(entry: ZikrEntryCreate) -> ZikrEntry:
     # Start with base edit_notes
     edit_notes = []
     
@@ -293,15 +832,29 @@ async def create_zikr_entry(entry: ZikrEntryCreate):
     if entry.comment:
         edit_notes.append(entry.comment)
     
-    zikr_obj = ZikrEntry(
+    return ZikrEntry(
+        id=entry.id or str(uuid.uuid4()),
         zikr_id=entry.zikr_id,
         count=entry.count,
         date=entry.date,
         timestamp=create_timestamp_from_client(entry.client_timestamp, entry.timezone),
         edit_notes=edit_notes
     )
-    await db.zikr_entries.insert_one(zikr_obj.dict())
-    return zikr_obj
+
+@api_router.post("/azkar/entry", response_model=ZikrEntry)
+async def create_zikr_entry(
+    entry: ZikrEntryCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=128),
+):
+    """Record a zikr entry with user's device timestamp; idempotent per entry id"""
+    client_entry_id(entry, idempotency_key)
+    return await store_entry("azkar", build_zikr_entry(entry), response)
+
+@api_router.post("/azkar/entries:batch", response_model=BatchResult)
+async def create_zikr_entries(batch: EntryBatch):
+    """Record many zikr entries (e.g. an offline queue of taps) in one request"""
+    return await insert_entry_batch("azkar", batch, ZikrEntryCreate, build_zikr_entry)
 
 @api_router.put("/azkar/entry/{entry_id}")
 async def update_zikr_entry(entry_id: str, update_data: ZikrEntryUpdate):
@@ -325,10 +878,18 @@ async def update_zikr_entry(entry_id: str, update_data: ZikrEntryUpdate):
             update_dict["edit_notes"] = edit_notes
         
         # Update the entry
-        await db.zikr_entries.update_one(
-            {"id": entry_id, "user_id": "default"}, 
-            {"$set": update_dict}
-        )
+        async with stamped_writes(db, "default", [update_dict]):
+            previous_entry = await db.zikr_entries.find_one_and_update(
+                {"id": entry_id, "user_id": "default"},
+                {"$set": update_dict},
+                return_document=ReturnDocument.BEFORE,
+            )
+        if previous_entry is None:
+            raise HTTPException(status_code=404, detail="Entry not found")
+        # Delta against the count this update replaced, so concurrent
+        # updates of one entry still add up in the rollup
+        await ROLLUPS.record("azkar", "default", previous_entry["zikr_id"], previous_entry["date"],
+                             update_data.count - previous_entry["count"], 0)
         
         # Return updated entry
         updated_entry = await db.zikr_entries.find_one({"id": entry_id, "user_id": "default"})
@@ -385,119 +946,71 @@ async def get_zikr_stats(zikr_id: int):
         )
 
 @api_router.get("/azkar/daily/{date}")
-async def get_daily_azkar(date: str):
-    """Get all azkar entries for a specific date"""
-    entries = await db.zikr_entries.find(
-        {"date": date, "user_id": "default"}
-    ).to_list(100)
-    
-    # Convert ObjectId to string for JSON serialization
-    for entry in entries:
-        if "_id" in entry:
-            entry["_id"] = str(entry["_id"])
-    
-    # Group by zikr_id and calculate totals
-    daily_summary = {}
-    total_daily = 0
-    
-    for entry in entries:
-        zikr_id = entry["zikr_id"]
-        count = entry["count"]
-        
-        if zikr_id not in daily_summary:
-            daily_summary[zikr_id] = {
-                "count": 0,
-                "sessions": 0,
-                "percentage": 0
-            }
-        
-        daily_summary[zikr_id]["count"] += count
-        daily_summary[zikr_id]["sessions"] += 1
-        total_daily += count
-    
-    # Calculate percentages
-    for zikr_id in daily_summary:
-        if total_daily > 0:
-            daily_summary[zikr_id]["percentage"] = round(
-                (daily_summary[zikr_id]["count"] / total_daily) * 100, 1
-            )
-        else:
-            daily_summary[zikr_id]["percentage"] = 0
-    
-    return {
+async def get_daily_azkar(date: str, include_entries: bool = Query(True, description="Also return the raw entries")):
+    """Get the azkar summary (and entries) for a specific date"""
+    daily_summary, total_daily, entries = await entry_summary(
+        "azkar", {"date": date, "user_id": "default"}, include_entries
+    )
+    response = {
         "date": date,
         "total_daily": total_daily,
         "azkar_summary": daily_summary,
-        "entries": entries
     }
+    if entries is not None:
+        response["entries"] = entries
+    return response
 
 @api_router.get("/azkar/range/{start_date}/{end_date}")
-async def get_azkar_range(start_date: str, end_date: str):
-    """Get all azkar entries for a date range"""
-    entries = await db.zikr_entries.find({
-        "date": {"$gte": start_date, "$lte": end_date},
-        "user_id": "default"
-    }).to_list(1000)
-    
-    # Convert ObjectId to string for JSON serialization
-    for entry in entries:
-        if "_id" in entry:
-            entry["_id"] = str(entry["_id"])
-    
-    # Group by zikr_id and calculate totals across the range
-    range_summary = {}
-    total_range = 0
-    
-    for entry in entries:
-        zikr_id = entry["zikr_id"]
-        count = entry["count"]
-        
-        if zikr_id not in range_summary:
-            range_summary[zikr_id] = {
-                "count": 0,
-                "sessions": 0,
-                "percentage": 0
-            }
-        
-        range_summary[zikr_id]["count"] += count
-        range_summary[zikr_id]["sessions"] += 1
-        total_range += count
-    
-    # Calculate percentages
-    for zikr_id in range_summary:
-        if total_range > 0:
-            range_summary[zikr_id]["percentage"] = round(
-                (range_summary[zikr_id]["count"] / total_range) * 100, 1
-            )
-        else:
-            range_summary[zikr_id]["percentage"] = 0
-    
-    return {
+async def get_azkar_range(start_date: str, end_date: str, include_entries: bool = Query(True, description="Also return the raw entries")):
+    """Get the azkar summary (and entries) for a date range"""
+    range_summary, total_range, entries = await entry_summary(
+        "azkar", {"date": {"$gte": start_date, "$lte": end_date}, "user_id": "default"}, include_entries
+    )
+    response = {
         "start_date": start_date,
         "end_date": end_date,
         "total_range": total_range,
         "azkar_summary": range_summary,
-        "entries": entries
     }
+    if entries is not None:
+        response["entries"] = entries
+    return response
+
+@api_router.get("/azkar/calendar/{month}")
+async def get_azkar_calendar(month: str):
+    """Per-day azkar totals for a month (YYYY-MM), for calendar views"""
+    return await month_calendar("azkar", month)
 
 # Charity endpoints
 @api_router.get("/charities")
-async def get_charity_list():
+async def get_charity_list(request: Request):
     """Get the list of available charities"""
-    return {"charities": CHARITY_LIST}
+    return CHARITIES_RESPONSE.response(request)
 
-@api_router.post("/charities/entry", response_model=CharityEntry)
-async def create_charity_entry(entry: CharityEntryCreate):
-    """Record a charity entry with user's device timestamp"""
-    charity_obj = CharityEntry(
+def build_charity_entry(entry: CharityEntryCreate) -> CharityEntry:
+    return CharityEntry(
+        id=entry.id or str(uuid.uuid4()),
         charity_id=entry.charity_id,
         count=entry.count,
         date=entry.date,
         comments=entry.comments,
         timestamp=create_timestamp_from_client(entry.client_timestamp, entry.timezone)
     )
-    await db.charity_entries.insert_one(charity_obj.dict())
-    return charity_obj
+
+@api_router.post("/charities/entry", response_model=CharityEntry)
+async def create_charity_entry(
+    entry: CharityEntryCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=128),
+):
+    """Record a charity entry with user's device timestamp; idempotent per entry id"""
+    client_entry_id(entry, idempotency_key)
+    return await store_entry("charity", build_charity_entry(entry), response)
+
+@api_router.post("/charities/entries:batch", response_model=BatchResult)
+async def create_charity_entries(batch: EntryBatch):
+    """Record many charity entries in one request"""
+    return await insert_entry_batch("charity", batch, CharityEntryCreate, build_charity_entry)
 
 @api_router.put("/charities/entry/{entry_id}")
 async def update_charity_entry(entry_id: str, update_data: CharityEntryUpdate):
@@ -524,10 +1037,18 @@ async def update_charity_entry(entry_id: str, update_data: CharityEntryUpdate):
             update_dict["edit_notes"] = edit_notes
         
         # Update the entry
-        await db.charity_entries.update_one(
-            {"id": entry_id, "user_id": "default"}, 
-            {"$set": update_dict}
-        )
+        async with stamped_writes(db, "default", [update_dict]):
+            previous_entry = await db.charity_entries.find_one_and_update(
+                {"id": entry_id, "user_id": "default"},
+                {"$set": update_dict},
+                return_document=ReturnDocument.BEFORE,
+            )
+        if previous_entry is None:
+            raise HTTPException(status_code=404, detail="Entry not found")
+        # Delta against the count this update replaced, so concurrent
+        # updates of one entry still add up in the rollup
+        await ROLLUPS.record("charity", "default", previous_entry["charity_id"], previous_entry["date"],
+                             update_data.count - previous_entry["count"], 0)
         
         # Return updated entry
         updated_entry = await db.charity_entries.find_one({"id": entry_id, "user_id": "default"})
@@ -584,100 +1105,62 @@ async def get_charity_stats(charity_id: int):
         )
 
 @api_router.get("/charities/daily/{date}")
-async def get_daily_charities(date: str):
-    """Get all charity entries for a specific date"""
-    entries = await db.charity_entries.find(
-        {"date": date, "user_id": "default"}
-    ).to_list(100)
-    
-    # Convert ObjectId to string for JSON serialization
-    for entry in entries:
-        if "_id" in entry:
-            entry["_id"] = str(entry["_id"])
-    
-    # Group by charity_id and calculate totals
-    daily_summary = {}
-    total_daily = 0
-    
-    for entry in entries:
-        charity_id = entry["charity_id"]
-        count = entry["count"]
-        
-        if charity_id not in daily_summary:
-            daily_summary[charity_id] = {
-                "count": 0,
-                "sessions": 0,
-                "percentage": 0
-            }
-        
-        daily_summary[charity_id]["count"] += count
-        daily_summary[charity_id]["sessions"] += 1
-        total_daily += count
-    
-    # Calculate percentages
-    for charity_id in daily_summary:
-        if total_daily > 0:
-            daily_summary[charity_id]["percentage"] = round(
-                (daily_summary[charity_id]["count"] / total_daily) * 100, 1
-            )
-        else:
-            daily_summary[charity_id]["percentage"] = 0
-    
-    return {
+async def get_daily_charities(date: str, include_entries: bool = Query(True, description="Also return the raw entries")):
+    """Get the charity summary (and entries) for a specific date"""
+    daily_summary, total_daily, entries = await entry_summary(
+        "charity", {"date": date, "user_id": "default"}, include_entries
+    )
+    response = {
         "date": date,
         "total_daily": total_daily,
         "charity_summary": daily_summary,
-        "entries": entries
     }
+    if entries is not None:
+        response["entries"] = entries
+    return response
 
 @api_router.get("/charities/range/{start_date}/{end_date}")
-async def get_charities_range(start_date: str, end_date: str):
-    """Get all charity entries for a date range"""
-    entries = await db.charity_entries.find({
-        "date": {"$gte": start_date, "$lte": end_date},
-        "user_id": "default"
-    }).to_list(1000)
-    
-    # Convert ObjectId to string for JSON serialization
-    for entry in entries:
-        if "_id" in entry:
-            entry["_id"] = str(entry["_id"])
-    
-    # Group by charity_id and calculate totals across the range
-    range_summary = {}
-    total_range = 0
-    
-    for entry in entries:
-        charity_id = entry["charity_id"]
-        count = entry["count"]
-        
-        if charity_id not in range_summary:
-            range_summary[charity_id] = {
-                "count": 0,
-                "sessions": 0,
-                "percentage": 0
-            }
-        
-        range_summary[charity_id]["count"] += count
-        range_summary[charity_id]["sessions"] += 1
-        total_range += count
-    
-    # Calculate percentages
-    for charity_id in range_summary:
-        if total_range > 0:
-            range_summary[charity_id]["percentage"] = round(
-                (range_summary[charity_id]["count"] / total_range) * 100, 1
-            )
-        else:
-            range_summary[charity_id]["percentage"] = 0
-    
-    return {
+async def get_charities_range(start_date: str, end_date: str, include_entries: bool = Query(True, description="Also return the raw entries")):
+    """Get the charity summary (and entries) for a date range"""
+    range_summary, total_range, entries = await entry_summary(
+        "charity", {"date": {"$gte": start_date, "$lte": end_date}, "user_id": "default"}, include_entries
+    )
+    response = {
         "start_date": start_date,
         "end_date": end_date,
         "total_range": total_range,
         "charity_summary": range_summary,
-        "entries": entries
     }
+    if entries is not None:
+        response["entries"] = entries
+    return response
+
+@api_router.get("/charities/calendar/{month}")
+async def get_charities_calendar(month: str):
+    """Per-day charity totals for a month (YYYY-MM), for calendar views"""
+    return await month_calendar("charity", month)
+
+# Sync endpoints
+# Upper bound on changes returned by one sync page
+MAX_SYNC_CHANGES = 1000
+
+@api_router.get("/sync/changes")
+async def sync_changes(
+    since: int = Query(0, ge=0, description="next_cursor from the previous page; 0 for all entries"),
+    limit: int = Query(500, ge=1, le=MAX_SYNC_CHANGES),
+):
+    """Azkar and charity entries inserted or updated after `since`, in change order.
+
+    Fetch again right away while has_more is true. retry_after (seconds) is
+    set when writes were still in flight; poll again after it to get them.
+    """
+    page, next_cursor, has_more, retry_after = await changes_since(db, "default", since, limit)
+    changes = []
+    for kind, entry in page:
+        # Convert ObjectId to string for JSON serialization
+        entry["_id"] = str(entry["_id"])
+        changes.append({"kind": kind, "entry": entry})
+    return {"changes": changes, "next_cursor": next_cursor, "has_more": has_more, "retry_after": retry_after}
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -690,13 +1173,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+@app.on_event("startup")
+async def prepare_db():
+    # In the background: with MongoDB unreachable, creating indexes would hold
+    # up startup until the server selection timeout
+    async def prepare():
+        await ensure_indexes(db)
+        await ensure_sequenced(db)
+        await ROLLUPS.ensure_backfilled()
+    app.state.index_task = asyncio.create_task(prepare())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+
+@app.on_event("shutdown")
+async def shutdown_search_pool():
+    QURAN.pool.shutdown()
\ No newline at end of file
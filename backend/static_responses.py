@@ -0,0 +1,77 @@
+"""
+Pre-serialized responses for catalog data that never changes at runtime.
+
+The JSON body (plus gzip and, when the optional `brotli` package is
+installed, brotli variants) is rendered once at startup and served with a
+strong ETag, so repeat requests carrying If-None-Match get a bodiless 304.
+"""
+
+import gzip
+import hashlib
+import json
+from typing import Dict
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """Accept-Encoding header -> {coding: q}"""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class PrerenderedJSON:
+    """A JSON payload rendered once into identity/gzip/br bytes with ETags"""
+
+    def __init__(self, payload, cache_control: str = 'no-cache'):
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.cache_control = cache_control
+
+        # coding -> (ETag, bytes); every representation gets its own strong ETag
+        self.variants: Dict[str, tuple] = {
+            'identity': (f'"{digest}"', body),
+            'gzip': (f'"{digest}-gzip"', gzip.compress(body, compresslevel=9, mtime=0)),
+        }
+        if brotli is not None:
+            self.variants['br'] = (f'"{digest}-br"', brotli.compress(body))
+        self.etags = {etag for etag, _ in self.variants.values()}
+
+    def response(self, request: Request) -> Response:
+        """Serve the best encoding the client accepts, or 304 if its copy is current"""
+        accepted = _accepted_encodings(request.headers.get('accept-encoding', ''))
+        coding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in self.variants and accepted.get(candidate, 0) > 0:
+                coding = candidate
+                break
+        etag, body = self.variants[coding]
+
+        headers = {'ETag': etag, 'Cache-Control': self.cache_control, 'Vary': 'Accept-Encoding'}
+
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match:
+            client_tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            if '*' in client_tags or client_tags & self.etags:
+                return Response(status_code=304, headers=headers)
+
+        if coding != 'identity':
+            headers['Content-Encoding'] = coding
+        return Response(content=body, media_type='application/json', headers=headers)
@@ -8,6 +8,7 @@ Updated for comprehensive testing after mobile fixes
 import requests
 import json
 import sys
+import uuid
 from datetime import datetime
 
 # Use the production URL from frontend/.env
@@ -1770,6 +1771,143 @@ def test_dawah_category_functionality():
     print("   ✅ Da'wah category (ID 13) is fully functional and ready for prayer integration")
     return True
 
+def azkar_daily_total(date):
+    """total_daily of the azkar daily summary for a date"""
+    response = requests.get(f"{BASE_URL}/azkar/daily/{date}", params={"include_entries": "false"})
+    response.raise_for_status()
+    return response.json()["total_daily"]
+
+def test_azkar_entry_idempotency():
+    """Test POST /api/azkar/entry stores an entry id once: a resend returns the original, counted once"""
+    print("\n🔍 Testing Azkar Entry Idempotency (POST /api/azkar/entry with a client id)...")
+    date = "2024-02-20"
+    all_passed = True
+
+    try:
+        total_before = azkar_daily_total(date)
+        entry_data = {"id": str(uuid.uuid4()), "zikr_id": 2, "count": 33, "date": date}
+
+        first = requests.post(f"{BASE_URL}/azkar/entry", json=entry_data)
+        second = requests.post(f"{BASE_URL}/azkar/entry", json={**entry_data, "count": 99})
+        print(f"   Status Codes: {first.status_code}, {second.status_code}")
+
+        if first.status_code != 200 or second.status_code != 200:
+            print("   ❌ FAIL: Expected status 200 for both requests")
+            return False
+
+        if first.headers.get("Idempotent-Replayed") is None and second.headers.get("Idempotent-Replayed") == "true":
+            print("   ✅ PASS: Only the resend is flagged with Idempotent-Replayed")
+        else:
+            print(f"   ❌ FAIL: Idempotent-Replayed headers: {first.headers.get('Idempotent-Replayed')}, {second.headers.get('Idempotent-Replayed')}")
+            all_passed = False
+
+        original, replay = first.json(), second.json()
+        if replay["id"] == entry_data["id"] and replay["count"] == 33 and replay["timestamp"] == original["timestamp"]:
+            print("   ✅ PASS: The resend returns the original entry")
+        else:
+            print(f"   ❌ FAIL: Expected the original entry, got {replay}")
+            all_passed = False
+
+        added = azkar_daily_total(date) - total_before
+        if added == 33:
+            print("   ✅ PASS: The entry is counted once in the daily total")
+        else:
+            print(f"   ❌ FAIL: Daily total grew by {added}, expected 33")
+            all_passed = False
+
+        # The Idempotency-Key header names the entry when the body has no id
+        key = str(uuid.uuid4())
+        keyed = [
+            requests.post(f"{BASE_URL}/azkar/entry", json={"zikr_id": 2, "count": 7, "date": date},
+                          headers={"Idempotency-Key": key})
+            for _ in range(2)
+        ]
+        if [r.status_code for r in keyed] == [200, 200] and all(r.json()["id"] == key for r in keyed) \
+                and keyed[1].headers.get("Idempotent-Replayed") == "true":
+            print("   ✅ PASS: Idempotency-Key is used as the entry id and replayed")
+        else:
+            print(f"   ❌ FAIL: Idempotency-Key requests returned {[(r.status_code, r.text) for r in keyed]}")
+            all_passed = False
+    except Exception as e:
+        print(f"   ❌ ERROR: {str(e)}")
+        all_passed = False
+
+    return all_passed
+
+def test_idempotency_key_mismatch():
+    """Test POST /api/azkar/entry and /api/charities/entry reject an Idempotency-Key other than the body id"""
+    print("\n🔍 Testing Idempotency-Key / entry id mismatch...")
+    all_passed = True
+
+    for path, entry_data in [
+        ("azkar/entry", {"zikr_id": 1, "count": 10, "date": "2024-02-20"}),
+        ("charities/entry", {"charity_id": 1, "count": 1, "date": "2024-02-20"}),
+    ]:
+        try:
+            response = requests.post(f"{BASE_URL}/{path}", json={**entry_data, "id": str(uuid.uuid4())},
+                                     headers={"Idempotency-Key": str(uuid.uuid4())})
+            print(f"   POST /api/{path} Status Code: {response.status_code}")
+            if response.status_code == 400:
+                print(f"   ✅ PASS: Mismatch rejected: {response.json().get('detail')}")
+            else:
+                print(f"   ❌ FAIL: Expected status 400, got {response.status_code}")
+                all_passed = False
+        except Exception as e:
+            print(f"   ❌ ERROR: {str(e)}")
+            all_passed = False
+
+    return all_passed
+
+def test_azkar_batch_duplicate_ids():
+    """Test POST /api/azkar/entries:batch stores an id repeated within a batch, or resent, once"""
+    print("\n🔍 Testing Azkar Batch with duplicate ids (POST /api/azkar/entries:batch)...")
+    date = "2024-02-21"
+    all_passed = True
+
+    try:
+        total_before = azkar_daily_total(date)
+        repeated_id = str(uuid.uuid4())
+        entries = [
+            {"id": repeated_id, "zikr_id": 3, "count": 10, "date": date},
+            {"id": repeated_id, "zikr_id": 3, "count": 10, "date": date},
+            {"id": str(uuid.uuid4()), "zikr_id": 4, "count": 5, "date": date},
+        ]
+
+        response = requests.post(f"{BASE_URL}/azkar/entries:batch", json={"entries": entries})
+        print(f"   Status Code: {response.status_code}")
+        if response.status_code != 200:
+            print(f"   ❌ FAIL: Expected status 200, got {response.status_code}")
+            return False
+
+        data = response.json()
+        replayed = [result["replayed"] for result in data["results"]]
+        if data["inserted"] == 2 and replayed == [False, True, False] \
+                and all(result["id"] == entry["id"] for result, entry in zip(data["results"], entries)):
+            print("   ✅ PASS: The repeated id is stored once and reported as replayed")
+        else:
+            print(f"   ❌ FAIL: Unexpected batch result: {data}")
+            all_passed = False
+
+        # Resending the whole batch (e.g. after a lost response) stores nothing
+        resend = requests.post(f"{BASE_URL}/azkar/entries:batch", json={"entries": entries}).json()
+        if resend["inserted"] == 0 and all(result["replayed"] for result in resend["results"]):
+            print("   ✅ PASS: Resending the batch stores nothing")
+        else:
+            print(f"   ❌ FAIL: Unexpected result for the resent batch: {resend}")
+            all_passed = False
+
+        added = azkar_daily_total(date) - total_before
+        if added == 15:
+            print("   ✅ PASS: Daily total counts each id once")
+        else:
+            print(f"   ❌ FAIL: Daily total grew by {added}, expected 15")
+            all_passed = False
+    except Exception as e:
+        print(f"   ❌ ERROR: {str(e)}")
+        all_passed = False
+
+    return all_passed
+
 def main():
     """Run all backend tests including new charity functionality"""
     print("🚀 Starting Comprehensive Backend API Tests for ALSABQON")
@@ -1800,6 +1938,9 @@ def main():
     test_results.append(("Azkar Statistics API", test_azkar_stats()))
     test_results.append(("Azkar Daily Summary", test_azkar_daily_summary()))
     test_results.append(("Complete Azkar Workflow", test_azkar_complete_flow()))
+    test_results.append(("Azkar Entry Idempotency", test_azkar_entry_idempotency()))
+    test_results.append(("Idempotency-Key Mismatch", test_idempotency_key_mismatch()))
+    test_results.append(("Azkar Batch Duplicate Ids", test_azkar_batch_duplicate_ids()))
     
     print("\n" + "=" * 70)
     print("🆕 NEW AZKAR RANGE FILTERING FUNCTIONALITY TESTS")
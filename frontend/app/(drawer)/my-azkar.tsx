@@ -128,7 +128,7 @@ export default function MyAzkarScreen() {
         const dateStr = formatDateForAPI(date);
         
         try {
-          const summary = await getDailyAzkar(dateStr);
+          const summary = await getDailyAzkar(dateStr, false);
           monthData[dateStr] = summary.total_daily || 0; // Use actual data or 0 if no data
         } catch (error) {
           console.error(`Error loading data for ${dateStr}:`, error);
@@ -154,7 +154,7 @@ export default function MyAzkarScreen() {
         const dateStr = formatDateForAPI(date);
         
         try {
-          const summary = await getDailyAzkar(dateStr);
+          const summary = await getDailyAzkar(dateStr, false);
           weekData[dateStr] = summary.total_daily || 0; // Use actual data or 0 if no data
         } catch (error) {
           console.error(`Error loading data for ${dateStr}:`, error);
@@ -176,7 +176,7 @@ export default function MyAzkarScreen() {
         // Load data for today
         const dateStr = formatDateForAPI(selectedDate);
         console.log('Loading today data for:', dateStr);
-        const summary = await getDailyAzkar(dateStr);
+        const summary = await getDailyAzkar(dateStr, false);
         setDailySummary(summary);
       } else if (selectedFilter === 'week') {
         // Load data for the last 7 days
@@ -188,7 +188,7 @@ export default function MyAzkarScreen() {
         const endDateStr = formatDateForAPI(endDate);
         console.log('Loading week data from:', startDateStr, 'to:', endDateStr);
         
-        const rangeData = await getAzkarRange(startDateStr, endDateStr);
+        const rangeData = await getAzkarRange(startDateStr, endDateStr, false);
         // Convert range data to daily summary format
         setDailySummary({
           date: `${startDateStr} to ${endDateStr}`,
@@ -206,7 +206,7 @@ export default function MyAzkarScreen() {
         const endDateStr = formatDateForAPI(endDate);
         console.log('Loading month data from:', startDateStr, 'to:', endDateStr);
         
-        const rangeData = await getAzkarRange(startDateStr, endDateStr);
+        const rangeData = await getAzkarRange(startDateStr, endDateStr, false);
         // Convert range data to daily summary format
         setDailySummary({
           date: `${startDateStr} to ${endDateStr}`,
@@ -220,7 +220,7 @@ export default function MyAzkarScreen() {
         const endDateStr = formatDateForAPI(customEndDate);
         console.log('Loading custom range data from:', startDateStr, 'to:', endDateStr);
         
-        const rangeData = await getAzkarRange(startDateStr, endDateStr);
+        const rangeData = await getAzkarRange(startDateStr, endDateStr, false);
         // Convert range data to daily summary format
         setDailySummary({
           date: `${startDateStr} to ${endDateStr}`,
@@ -232,7 +232,7 @@ export default function MyAzkarScreen() {
         // Fallback to today's data
         const dateStr = formatDateForAPI(selectedDate);
         console.log('Loading fallback data for:', dateStr);
-        const summary = await getDailyAzkar(dateStr);
+        const summary = await getDailyAzkar(dateStr, false);
         setDailySummary(summary);
       }
     } catch (error) {
@@ -116,7 +116,7 @@ export default function MyCharitiesScreen() {
         // Load data for today
         const dateStr = formatDateForAPI(selectedDate);
         console.log('Loading today charity data for:', dateStr);
-        const result = await getDailyCharity(dateStr);
+        const result = await getDailyCharity(dateStr, false);
         setDailySummary(result);
       } else if (selectedFilter === 'week') {
         // Load data for the last 7 days
@@ -128,7 +128,7 @@ export default function MyCharitiesScreen() {
         const endDateStr = formatDateForAPI(endDate);
         console.log('Loading week charity data from:', startDateStr, 'to:', endDateStr);
         
-        const rangeData = await getCharityRange(startDateStr, endDateStr);
+        const rangeData = await getCharityRange(startDateStr, endDateStr, false);
         // Convert range data to daily summary format
         setDailySummary({
           date: `${startDateStr} to ${endDateStr}`,
@@ -146,7 +146,7 @@ export default function MyCharitiesScreen() {
         const endDateStr = formatDateForAPI(endDate);
         console.log('Loading month charity data from:', startDateStr, 'to:', endDateStr);
         
-        const rangeData = await getCharityRange(startDateStr, endDateStr);
+        const rangeData = await getCharityRange(startDateStr, endDateStr, false);
         // Convert range data to daily summary format
         setDailySummary({
           date: `${startDateStr} to ${endDateStr}`,
@@ -160,7 +160,7 @@ export default function MyCharitiesScreen() {
         const endDateStr = formatDateForAPI(customEndDate);
         console.log('Loading custom range charity data from:', startDateStr, 'to:', endDateStr);
         
-        const rangeData = await getCharityRange(startDateStr, endDateStr);
+        const rangeData = await getCharityRange(startDateStr, endDateStr, false);
         // Convert range data to daily summary format
         setDailySummary({
           date: `${startDateStr} to ${endDateStr}`,
@@ -172,7 +172,7 @@ export default function MyCharitiesScreen() {
         // Fallback to today's data
         const dateStr = formatDateForAPI(selectedDate);
         console.log('Loading fallback charity data for:', dateStr);
-        const result = await getDailyCharity(dateStr);
+        const result = await getDailyCharity(dateStr, false);
         setDailySummary(result);
       }
     } catch (error) {
@@ -207,7 +207,7 @@ export default function MyCharitiesScreen() {
         const dateStr = formatDateForAPI(currentDate);
         
         try {
-          const dayResult = await getDailyCharity(dateStr);
+          const dayResult = await getDailyCharity(dateStr, false);
           totalCount += dayResult.total_daily || 0;
           
           // Aggregate charity counts
@@ -258,7 +258,7 @@ export default function MyCharitiesScreen() {
         const date = new Date(year, month, day);
         const dateStr = formatDateForAPI(date);
         try {
-          const result = await getDailyCharity(dateStr);
+          const result = await getDailyCharity(dateStr, false);
           charityData[dateStr] = result.total_daily;
         } catch (error) {
           charityData[dateStr] = 0; // Default to 0 if no data
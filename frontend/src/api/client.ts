@@ -68,16 +68,39 @@ export async function getJson<T>(path: string): Promise<T> {
   return (await res.json()) as T;
 }
 
-export async function postJson<T>(path: string, body: any): Promise<T> {
+export async function postJson<T>(path: string, body: any, headers: Record<string, string> = {}): Promise<T> {
   const res = await fetch(api(path), {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: { "Content-Type": "application/json", ...headers },
     body: JSON.stringify(body),
   });
   if (!res.ok) throw new Error(`HTTP ${res.status}`);
   return (await res.json()) as T;
 }
 
+// Random (v4) UUID for entries created on the device
+export function newEntryId(): string {
+  const cryptoApi = (globalThis as any).crypto;
+  if (cryptoApi?.randomUUID) return cryptoApi.randomUUID();
+  return "xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx".replace(/[xy]/g, (c) => {
+    const r = (Math.random() * 16) | 0;
+    return (c === "x" ? r : (r & 0x3) | 0x8).toString(16);
+  });
+}
+
+// POST a new entry under an id generated on the device. The server stores
+// each id once, so when the request fails on the network (the entry may or
+// may not have been stored) it is safe to send again, and it is
+async function postEntry<T>(path: string, entryId: string, body: any): Promise<T> {
+  const send = () => postJson<T>(path, { id: entryId, ...body }, { "Idempotency-Key": entryId });
+  try {
+    return await send();
+  } catch (error) {
+    if (error instanceof Error && error.message.startsWith("HTTP ")) throw error;
+    return send();
+  }
+}
+
 // Azkar Types
 export interface Zikr {
   id: number;
@@ -106,7 +129,13 @@ export interface DailyAzkarSummary {
   date: string;
   total_daily: number;
   azkar_summary: Record<number, { count: number; sessions: number; percentage: number }>;
-  entries: ZikrEntry[];
+  entries?: ZikrEntry[]; // omitted when includeEntries is false
+}
+
+// Result of a batch create: one item per submitted entry, in order
+export interface BatchResult {
+  inserted: number;
+  results: { id: string | null; replayed: boolean; error: string | null }[];
 }
 
 // Azkar API Functions
@@ -114,13 +143,15 @@ export async function getAzkarList(): Promise<{ azkar: Zikr[] }> {
   return getJson<{ azkar: Zikr[] }>("/azkar");
 }
 
+// Pass the same entryId when retrying a failed call so the entry is not stored twice
 export async function createZikrEntry(
   zikrId: number,
   count: number,
   date: string,
-  comment?: string
+  comment?: string,
+  entryId: string = newEntryId()
 ): Promise<ZikrEntry> {
-  return postJson<ZikrEntry>("/azkar/entry", {
+  return postEntry<ZikrEntry>("/azkar/entry", entryId, {
     zikr_id: zikrId,
     count: count,
     date: date,
@@ -130,6 +161,15 @@ export async function createZikrEntry(
   });
 }
 
+// Entries queued on the device, each with the timezone/client_timestamp
+// captured when it was recorded and an id generated on the device, so
+// resending the batch after a failed request stores nothing twice
+export async function createZikrEntries(
+  entries: { id?: string; zikr_id: number; count: number; date: string; timezone?: string; client_timestamp?: string; comment?: string }[]
+): Promise<BatchResult> {
+  return postJson<BatchResult>("/azkar/entries:batch", { entries });
+}
+
 export async function updateZikrEntry(
   entryId: string,
   count: number,
@@ -160,18 +200,20 @@ export async function getZikrStats(zikrId: number): Promise<ZikrStats> {
   return getJson<ZikrStats>(`/azkar/${zikrId}/stats`);
 }
 
-export async function getDailyAzkar(date: string): Promise<DailyAzkarSummary> {
-  return getJson<DailyAzkarSummary>(`/azkar/daily/${date}`);
+// Pass includeEntries=false when only the totals are shown; the raw entries
+// of a long range can be large
+export async function getDailyAzkar(date: string, includeEntries: boolean = true): Promise<DailyAzkarSummary> {
+  return getJson<DailyAzkarSummary>(`/azkar/daily/${date}?include_entries=${includeEntries}`);
 }
 
-export async function getAzkarRange(startDate: string, endDate: string): Promise<{
+export async function getAzkarRange(startDate: string, endDate: string, includeEntries: boolean = true): Promise<{
   start_date: string;
   end_date: string;
   total_range: number;
   azkar_summary: Record<number, { count: number; sessions: number; percentage: number }>;
-  entries: ZikrEntry[];
+  entries?: ZikrEntry[];
 }> {
-  return getJson(`/azkar/range/${startDate}/${endDate}`);
+  return getJson(`/azkar/range/${startDate}/${endDate}?include_entries=${includeEntries}`);
 }
 
 // Charity Types
@@ -206,7 +248,7 @@ export interface DailyCharitySummary {
   date: string;
   total_daily: number;
   charity_summary: Record<number, { count: number; sessions: number; percentage: number }>;
-  entries: CharityEntry[];
+  entries?: CharityEntry[]; // omitted when includeEntries is false
 }
 
 // Charity API Functions
@@ -214,13 +256,15 @@ export async function getCharityList(): Promise<{ charities: Charity[] }> {
   return getJson<{ charities: Charity[] }>("/charities");
 }
 
+// Pass the same entryId when retrying a failed call so the entry is not stored twice
 export async function createCharityEntry(
   charityId: number,
   count: number,
   date: string,
-  comments?: string
+  comments?: string,
+  entryId: string = newEntryId()
 ): Promise<CharityEntry> {
-  return postJson<CharityEntry>("/charities/entry", {
+  return postEntry<CharityEntry>("/charities/entry", entryId, {
     charity_id: charityId,
     count: count,
     date: date,
@@ -230,6 +274,12 @@ export async function createCharityEntry(
   });
 }
 
+export async function createCharityEntries(
+  entries: { id?: string; charity_id: number; count: number; date: string; timezone?: string; client_timestamp?: string; comments?: string }[]
+): Promise<BatchResult> {
+  return postJson<BatchResult>("/charities/entries:batch", { entries });
+}
+
 export async function updateCharityEntry(
   entryId: string,
   count: number,
@@ -262,16 +312,31 @@ export async function getCharityStats(charityId: number): Promise<CharityStats>
   return getJson<CharityStats>(`/charities/${charityId}/stats`);
 }
 
-export async function getDailyCharity(date: string): Promise<DailyCharitySummary> {
-  return getJson<DailyCharitySummary>(`/charities/daily/${date}`);
+export async function getDailyCharity(date: string, includeEntries: boolean = true): Promise<DailyCharitySummary> {
+  return getJson<DailyCharitySummary>(`/charities/daily/${date}?include_entries=${includeEntries}`);
 }
 
-export async function getCharityRange(startDate: string, endDate: string): Promise<{
+export async function getCharityRange(startDate: string, endDate: string, includeEntries: boolean = true): Promise<{
   start_date: string;
   end_date: string;
   total_range: number;
   charity_summary: Record<number, { count: number; sessions: number; percentage: number }>;
-  entries: CharityEntry[];
+  entries?: CharityEntry[];
 }> {
-  return getJson(`/charities/range/${startDate}/${endDate}`);
-}
\ No newline at end of file
+  return getJson(`/charities/range/${startDate}/${endDate}?include_entries=${includeEntries}`);
+}
+
+// Sync API
+export interface SyncChanges {
+  changes: ({ kind: "azkar"; entry: ZikrEntry } | { kind: "charity"; entry: CharityEntry })[];
+  next_cursor: number; // pass as `since` on the next call
+  has_more: boolean; // fetch the next page right away
+  retry_after: number | null; // seconds; writes were still in flight
+}
+
+// Entries inserted or updated after `since` (0 for everything), oldest change first.
+// Run a full sync (since=0) now and then, e.g. daily, to pick up any write that
+// became visible only after its reservation expired on the server.
+export async function getChanges(since: number = 0, limit: number = 500): Promise<SyncChanges> {
+  return getJson<SyncChanges>(`/sync/changes?since=${since}&limit=${limit}`);
+}
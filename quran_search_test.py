@@ -296,6 +296,44 @@ def test_search_parameters():
     
     return all_passed
 
+def test_search_pagination():
+    """Test ranked search pages with limit and cursor continuation"""
+    print("\n🔍 Testing Search Pagination (limit + cursor)...")
+    try:
+        first = requests.get(f"{BASE_URL}/quran/search", params={"query": "الله", "limit": 10})
+        print(f"   Status Code: {first.status_code}")
+        if first.status_code != 200:
+            print(f"   ❌ FAIL: Expected status 200, got {first.status_code}")
+            return False
+
+        data = first.json()
+        results = data.get("results", [])
+        next_cursor = data.get("next_cursor")
+        print(f"   Page 1: {len(results)} results of {data.get('total')} total")
+        if len(results) != 10 or not next_cursor:
+            print(f"   ❌ FAIL: Expected 10 results and a next_cursor, got {len(results)} / {next_cursor}")
+            return False
+
+        second = requests.get(f"{BASE_URL}/quran/search", params={"query": "الله", "limit": 10, "cursor": next_cursor})
+        page_two = second.json().get("results", [])
+        first_keys = {(r["surahNumber"], r["ayah"]) for r in results}
+        overlap = [r for r in page_two if (r["surahNumber"], r["ayah"]) in first_keys]
+        if second.status_code == 200 and page_two and not overlap:
+            print(f"   ✅ PASS: Page 2 returned {len(page_two)} new results")
+        else:
+            print(f"   ❌ FAIL: Page 2 status {second.status_code}, {len(page_two)} results, {len(overlap)} repeated")
+            return False
+
+        bad = requests.get(f"{BASE_URL}/quran/search", params={"query": "الله", "cursor": "not-a-cursor"})
+        if bad.status_code == 400:
+            print("   ✅ PASS: Malformed cursor rejected with 400")
+            return True
+        print(f"   ❌ FAIL: Malformed cursor returned status {bad.status_code}")
+        return False
+    except Exception as e:
+        print(f"   ❌ ERROR: {str(e)}")
+        return False
+
 def test_database_connectivity():
     """Test database connectivity for Quran data by checking surahs endpoint"""
     print("\n🔍 Testing Database Connectivity for Quran Data...")
@@ -460,6 +498,7 @@ def main():
     test_results.append(("Arabic Search with Diacritics", test_arabic_search_with_diacritics()))
     test_results.append(("Response Format", test_search_response_format()))
     test_results.append(("Search Parameters", test_search_parameters()))
+    test_results.append(("Search Pagination", test_search_pagination()))
     test_results.append(("Search Performance", test_search_performance()))
     test_results.append(("Edge Cases", test_edge_cases()))
     
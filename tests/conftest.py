@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+
+@pytest.fixture(scope='session')
+def quran_data():
+    """Small Arabic-like corpus in the quran_data.json shape"""
+    from benchmark_search import SyntheticCorpus
+    return SyntheticCorpus(seed=7, scale=0.02).data
@@ -0,0 +1,78 @@
+"""Tests for backend/arabic_text.py"""
+
+import pytest
+
+from arabic_text import arabic_root, normalize_arabic, normalize_with_offsets
+
+
+@pytest.mark.parametrize('word, root', [
+    ('رحمة', 'رحم'),
+    ('الرحمن', 'رحم'),
+    ('برحمته', 'رحم'),
+    ('الرحيم', 'رحم'),
+    ('يرحمكم', 'رحم'),
+    ('مرحوم', 'رحم'),
+    ('كتاب', 'كتب'),
+    ('الكتاب', 'كتب'),
+    ('مكتوب', 'كتب'),
+    ('يكتبون', 'كتب'),
+    ('عالم', 'علم'),
+    ('استغفر', 'غفر'),
+    # Plural suffixes come off before one-letter "prefixes" that are root letters
+    ('كفروا', 'كفر'),
+    ('كتبوا', 'كتب'),
+    ('سجدوا', 'سجد'),
+    ('الكافرين', 'كفر'),
+    ('الضالين', 'ضال'),
+    # Hamza reads as alef whichever letter carries it
+    ('آمنوا', 'امن'),
+    ('المؤمنون', 'امن'),
+    ('المؤمنين', 'امن'),
+    ('يؤمنون', 'امن'),
+])
+def test_arabic_root(word, root):
+    assert arabic_root(normalize_arabic(word)) == root
+
+
+@pytest.mark.parametrize('query, word', [
+    ('كفر', 'كفروا'),
+    ('امن', 'المؤمنين'),
+    ('آمنوا', 'المؤمنين'),
+    ('سجد', 'سجدوا'),
+])
+def test_root_query_matches_inflected_word(query, word):
+    assert arabic_root(normalize_arabic(query)) == arabic_root(normalize_arabic(word))
+
+
+@pytest.mark.parametrize('text, normalized', [
+    ('بِسْمِ اللَّهِ', 'بسم الله'),
+    ('أَنْعَمْتَ', 'انعمت'),
+    ('إِيَّاكَ', 'اياك'),
+    ('ٱلْحَمْدُ', 'الحمد'),
+    ('رَحْمَةً', 'رحمه'),
+    ('هُدًى', 'هدي'),
+    ('', ''),
+])
+def test_normalize_arabic(text, normalized):
+    assert normalize_arabic(text) == normalized
+
+
+@pytest.mark.parametrize('text, word, highlighted', [
+    ('بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ', 'الرحمن', 'الرَّحْمَٰنِ'),
+    ('بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ', 'بسم', 'بِسْمِ'),
+    ('صِرَاطَ الَّذِينَ أَنْعَمْتَ عَلَيْهِمْ', 'انعمت', 'أَنْعَمْتَ'),
+    ('ٱلْحَمْدُ لِلَّهِ', 'الحمد', 'ٱلْحَمْدُ'),
+    ('ٱلْحَمْدُ لِلَّهِ', 'لله', 'لِلَّهِ'),
+    ('رَحْمَةً', 'رحمه', 'رَحْمَةً'),
+])
+def test_normalize_with_offsets_maps_spans_back(text, word, highlighted):
+    normalized, starts, ends = normalize_with_offsets(text)
+    assert normalized == normalize_arabic(text)
+    start = normalized.index(word)
+    end = start + len(word)
+    assert text[starts[start]:ends[end - 1]] == highlighted
+
+
+def test_normalize_with_offsets_drops_leading_tashkeel():
+    normalized, starts, ends = normalize_with_offsets('ًب')
+    assert (normalized, starts, ends) == ('ب', [1], [2])
@@ -0,0 +1,91 @@
+import mmap
+
+import pytest
+
+from quran_corpus import QuranCorpus, build_corpus_bytes, write_corpus_file
+
+SMALL = {"surahs": [
+    {"number": 1, "surah": "الفاتحة", "nameEn": "Al-Fatihah", "ayahs": [
+        {"ayah_number": 1, "text": "بِسْمِ اللَّهِ", "en": "In the name of Allah", "tafsir": [{"text": "أ"}, {"text": "ب"}]},
+        {"ayah_number": 2, "text": "الْحَمْدُ لِلَّهِ", "es": "Alabado sea Allah", "tafsir": []},
+        {"ayah_number": 3, "text": "الرَّحْمَٰنِ الرَّحِيمِ"},
+    ]},
+    {"number": 2, "surah": "البقرة", "ayahs": [
+        {"ayah_number": 1, "text": "الم", "en": "", "tafsir": [{"text": ""}, {"text": None}, {"text": "ج"}]},
+    ]},
+    {"number": 3, "surah": "آل عمران", "nameEn": "Ali 'Imran", "ayahs": []},
+]}
+
+
+def _assert_matches(corpus, quran_data):
+    assert corpus.surah_count == len(quran_data['surahs'])
+    doc_id = 0
+    for surah_index, s in enumerate(quran_data['surahs']):
+        assert corpus.surahs[surah_index] == {
+            "number": s['number'],
+            "nameAr": s['surah'],
+            "nameEn": s.get('nameEn', f"Surah {s['number']}"),
+        }
+        assert corpus.surah_index(s['number']) == surah_index
+        assert corpus.surah_ayahs(surah_index) == range(doc_id, doc_id + len(s['ayahs']))
+        for a in s['ayahs']:
+            assert corpus.ayah_doc(s['number'], a['ayah_number']) == doc_id
+            assert corpus.ayah_surah(doc_id) is corpus.surahs[surah_index]
+            assert corpus.ayah_number(doc_id) == a['ayah_number']
+            assert corpus.ayah_text(doc_id) == a['text']
+            assert corpus.ayah_translation(doc_id, 'en') == (a.get('en') or None)
+            assert corpus.ayah_translation(doc_id, 'es') == (a.get('es') or None)
+            tafsir = tuple(t.get('text') or '' for t in a.get('tafsir') or [])
+            assert corpus.tafsir(s['number'], a['ayah_number']) == tafsir
+            assert tuple(corpus.tafsir_text(t) for t in corpus.tafsir_range(doc_id)) == tafsir
+            doc_id += 1
+    assert corpus.ayah_count == doc_id
+
+
+@pytest.mark.parametrize('data', ['small', 'synthetic'])
+def test_round_trip(data, quran_data, tmp_path):
+    data = SMALL if data == 'small' else quran_data
+    in_memory = QuranCorpus(build_corpus_bytes(data))
+    _assert_matches(in_memory, data)
+
+    path = tmp_path / 'quran_corpus.bin'
+    assert write_corpus_file(data, path) == path.stat().st_size
+    mapped = QuranCorpus.open(path)
+    assert isinstance(mapped._buffer, mmap.mmap)
+    _assert_matches(mapped, data)
+    assert mapped.digest == in_memory.digest
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_digest_changes_with_content():
+    edited = {"surahs": [dict(SMALL['surahs'][0], ayahs=[dict(SMALL['surahs'][0]['ayahs'][0], text="نص")])]}
+    assert QuranCorpus.from_json(SMALL).digest != QuranCorpus.from_json(edited).digest
+
+
+def test_ayah_range_is_clamped_to_the_surah():
+    corpus = QuranCorpus.from_json(SMALL)
+    assert corpus.ayah_range(1) == range(0, 3)
+    assert corpus.ayah_range(1, 2) == range(1, 3)
+    assert corpus.ayah_range(1, 0, 2) == range(0, 2)
+    assert corpus.ayah_range(1, 2, 99) == range(1, 3)
+    assert not corpus.ayah_range(1, 4, 9)
+    assert not corpus.ayah_range(1, 3, 2)
+    assert corpus.ayah_range(2, 1, 1) == range(3, 4)
+    assert not corpus.ayah_range(3)
+
+
+def test_missing_surah_or_ayah_raises_key_error():
+    corpus = QuranCorpus.from_json(SMALL)
+    with pytest.raises(KeyError):
+        corpus.ayah_doc(1, 4)
+    with pytest.raises(KeyError):
+        corpus.ayah_range(4)
+    with pytest.raises(KeyError):
+        corpus.tafsir(114, 1)
+
+
+def test_rejects_other_formats():
+    corpus_bytes = bytearray(build_corpus_bytes(SMALL))
+    corpus_bytes[:4] = b'JSON'
+    with pytest.raises(ValueError):
+        QuranCorpus(bytes(corpus_bytes))
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from arabic_text import normalize_arabic
+from quran_corpus import QuranCorpus
+from quran_index import InvertedIndex, QuranSearchIndex, parse_search_query
+
+
+@pytest.fixture(scope='module')
+def index(quran_data):
+    return QuranSearchIndex(QuranCorpus.from_json(quran_data))
+
+
+def _ayahs(quran_data):
+    return [a for s in quran_data['surahs'] for a in s['ayahs']]
+
+
+def _reference_matches(quran_data, tokens):
+    """The original linear scan: every token in the ayah text, or every token in one tafsir entry"""
+    matches = set()
+    for doc_id, a in enumerate(_ayahs(quran_data)):
+        texts = [a['text']] + [t['text'] for t in a['tafsir']]
+        if any(all(tok in normalize_arabic(text) for tok in tokens) for text in texts):
+            matches.add(doc_id)
+    return matches
+
+
+def _random_queries(quran_data, count):
+    """Queries built from whole words and word fragments of ayah and tafsir text"""
+    rng = random.Random(3)
+    ayahs = _ayahs(quran_data)
+    queries = []
+    for _ in range(count):
+        a = rng.choice(ayahs)
+        words = normalize_arabic(rng.choice([a['text'], rng.choice(a['tafsir'])['text']])).split()
+        tokens = []
+        for word in rng.sample(words, min(len(words), rng.randint(1, 3))):
+            start = rng.randrange(len(word) - 1)
+            tokens.append(word[start:rng.randint(start + 2, len(word))])
+        queries.append(' '.join(tokens))
+    return queries
+
+
+def test_search_matches_substring_scan(quran_data, index):
+    for q in _random_queries(quran_data, 200):
+        query = parse_search_query(q)
+        expected = _reference_matches(quran_data, query.tokens)
+        assert set(index.search(query)) == expected, q
+        assert list(index.iter_matches(query)) == sorted(expected), q
+
+
+def test_search_ignores_diacritics_in_query(quran_data, index):
+    word = normalize_arabic(_ayahs(quran_data)[0]['text']).split()[0]
+    diacritized = 'َ'.join(word)
+    assert set(index.search(parse_search_query(diacritized))) == _reference_matches(quran_data, [word])
+
+
+def test_tafsir_tokens_must_share_one_entry():
+    data = {"surahs": [{"number": 1, "surah": "الفاتحة", "ayahs": [
+        {"ayah_number": 1, "text": "بسم الله", "tafsir": [{"text": "رحمة واسعة"}, {"text": "عدل تام"}]},
+        {"ayah_number": 2, "text": "الحمد لله", "tafsir": [{"text": "رحمة وعدل"}]},
+    ]}]}
+    index = QuranSearchIndex(QuranCorpus.from_json(data))
+    query = parse_search_query('رحمة عدل')
+    assert set(index.search(query)) == {1}
+    assert list(index.iter_matches(query)) == [1]
+
+
+def test_inverted_index_matches_inside_words():
+    texts = ['الرحمن الرحيم', 'رب العالمين', 'مالك يوم الدين']
+    index = InvertedIndex(texts)
+    assert set(index.search(['رحم'])) == {0}
+    assert set(index.search(['ال', 'ين'])) == {1, 2}
+    assert set(index.search(['ال', 'رحيم', 'رب'])) == set()
+    assert list(index.iter_docs(['ال'])) == [0, 1, 2]
+    assert index.search([]) == {}
+
+
+def test_ranked_pages_are_stable_and_disjoint(quran_data, index):
+    for q in _random_queries(quran_data, 30):
+        query = parse_search_query(q)
+        scores = index.search(query)
+        full, total = index.ranked(query, 0, len(scores))
+        assert total == len(scores)
+        assert sorted(full) == sorted(scores)
+        assert all(scores[a] >= scores[b] for a, b in zip(full, full[1:]))
+
+        pages = []
+        for offset in range(0, total + 3, 3):
+            page, page_total = index.ranked(query, offset, 3)
+            assert page_total == total
+            assert page == index.ranked(query, offset, 3)[0]
+            pages.extend(page)
+        assert pages == full
+
+
+def test_ranked_breaks_ties_in_corpus_order():
+    ayahs = [{"ayah_number": n, "text": "بسم الله", "tafsir": []} for n in range(1, 6)]
+    index = QuranSearchIndex(QuranCorpus.from_json({"surahs": [{"number": 1, "surah": "الفاتحة", "ayahs": ayahs}]}))
+    query = parse_search_query('الله')
+    assert index.ranked(query, 0, 2) == ([0, 1], 5)
+    assert index.ranked(query, 2, 2) == ([2, 3], 5)
+    assert index.ranked(query, 4, 2) == ([4], 5)
+    assert index.ranked(query, 6, 2) == ([], 5)
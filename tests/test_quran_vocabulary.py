@@ -0,0 +1,63 @@
+"""Tests for backend/quran_vocabulary.py"""
+
+import pytest
+
+from quran_vocabulary import FuzzyVocabulary, PrefixSuggester, levenshtein
+
+VOCABULARY = ['الرحمن', 'الرحيم', 'رحمه', 'كتاب', 'قال', 'قل', 'المستقيم', 'المستقيمين']
+
+
+@pytest.fixture(scope='module')
+def fuzzy():
+    return FuzzyVocabulary(VOCABULARY)
+
+
+@pytest.mark.parametrize('token, expected', [
+    ('الرحمن', ((0, 'الرحمن'),)),
+    ('الرحمان', ((1, 'الرحمن'),)),
+    ('الرحم', ((1, 'الرحمن'), (1, 'الرحيم'))),
+    ('المستقم', ((1, 'المستقيم'),)),
+    # 8+ letters get a budget of 2
+    ('المستقيين', ((1, 'المستقيمين'), (2, 'المستقيم'))),
+    # 3 letters or fewer must match exactly
+    ('قال', ((0, 'قال'),)),
+    ('قول', ()),
+    ('كتب', ()),
+])
+def test_fuzzy_similar(fuzzy, token, expected):
+    assert fuzzy.similar(token) == expected
+
+
+def test_fuzzy_similar_agrees_with_levenshtein(fuzzy):
+    for token in ['الرحمان', 'الرحم', 'المستقيين', 'رحمت']:
+        for distance, word in fuzzy.similar(token):
+            assert levenshtein(token, word) == distance
+
+
+@pytest.mark.parametrize('a, b, distance', [
+    ('', '', 0),
+    ('رحم', '', 3),
+    ('الرحمن', 'الرحمان', 1),
+    ('قال', 'قول', 1),
+    ('كتاب', 'كاتب', 2),
+])
+def test_levenshtein(a, b, distance):
+    assert levenshtein(a, b) == distance == levenshtein(b, a)
+
+
+@pytest.fixture(scope='module')
+def suggester():
+    return PrefixSuggester({'الله': 50, 'الذين': 40, 'الذي': 30, 'الذى': 30, 'الا': 10, 'رب': 5})
+
+
+@pytest.mark.parametrize('prefix, limit, expected', [
+    ('الذ', 2, (('الذين', 40), ('الذى', 30))),
+    # Equal counts are ordered by word
+    ('الذ', 10, (('الذين', 40), ('الذى', 30), ('الذي', 30))),
+    ('ال', 1, (('الله', 50),)),
+    ('رب', 3, (('رب', 5),)),
+    ('ز', 3, ()),
+    ('', 3, ()),
+])
+def test_prefix_complete(suggester, prefix, limit, expected):
+    assert suggester.complete(prefix, limit) == expected
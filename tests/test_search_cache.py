@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import search_cache
+from search_cache import MemoryCacheBackend, SearchCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # Only the cache's clock: the event loop keeps reading the real one
+    monkeypatch.setattr(search_cache, 'time', SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    backend = MemoryCacheBackend(max_entries=10, ttl_seconds=60)
+    asyncio.run(backend.set('a', b'1'))
+    clock.now += 59
+    assert asyncio.run(backend.get('a')) == b'1'
+    clock.now += 2
+    assert asyncio.run(backend.get('a')) is None
+    assert backend.size() == 0
+
+
+def test_setting_again_renews_ttl(clock):
+    backend = MemoryCacheBackend(max_entries=10, ttl_seconds=60)
+    asyncio.run(backend.set('a', b'1'))
+    clock.now += 50
+    asyncio.run(backend.set('a', b'2'))
+    clock.now += 50
+    assert asyncio.run(backend.get('a')) == b'2'
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    backend = MemoryCacheBackend(max_entries=2, ttl_seconds=60)
+
+    async def scenario():
+        await backend.set('a', b'1')
+        await backend.set('b', b'2')
+        assert await backend.get('a') == b'1'  # 'b' is now least recently used
+        await backend.set('c', b'3')
+        return [await backend.get(key) for key in 'abc']
+
+    assert asyncio.run(scenario()) == [b'1', None, b'3']
+    assert backend.size() == 2
+    assert backend.evictions == 1
+
+
+class FailingBackend:
+    async def get(self, key):
+        raise ConnectionError('down')
+
+    async def set(self, key, value):
+        raise ConnectionError('down')
+
+    def size(self):
+        return None
+
+
+def test_backend_failures_count_as_misses():
+    cache = SearchCache(FailingBackend())
+    asyncio.run(cache.set('a', b'1'))
+    assert asyncio.run(cache.get('a')) is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_stats_count_hits_and_misses(clock):
+    cache = SearchCache.from_settings(None, max_entries=10, ttl_seconds=60)
+    asyncio.run(cache.set('a', b'1'))
+    for key in ('a', 'a', 'b', 'a'):
+        asyncio.run(cache.get(key))
+    assert cache.stats() == {
+        "backend": "MemoryCacheBackend", "hits": 3, "misses": 1, "hit_rate": 0.75, "size": 1, "evictions": 0,
+    }
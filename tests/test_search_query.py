@@ -0,0 +1,41 @@
+"""Tests for parse_search_query in backend/quran_index.py"""
+
+import pytest
+
+from quran_index import DEFAULT_NEAR_DISTANCE, parse_search_query
+
+
+@pytest.mark.parametrize('query, terms, phrases, near', [
+    ('الله NEAR رحمة', [], [], [('الله', 'رحمه', DEFAULT_NEAR_DISTANCE)]),
+    ('الله NEAR/2 رحمة', [], [], [('الله', 'رحمه', 2)]),
+    ('الله NEAR/0 رب', [], [], [('الله', 'رب', 0)]),
+    ('اللَّهِ NEAR/3 رَحْمَةً', [], [], [('الله', 'رحمه', 3)]),
+    # Dangling and repeated operators are dropped
+    ('NEAR الله', ['الله'], [], []),
+    ('الله NEAR', ['الله'], [], []),
+    ('NEAR', [], [], []),
+    ('الله NEAR NEAR رحمة', ['الله', 'رحمه'], [], []),
+    # Only single words take part in NEAR
+    ('"بسم الله" NEAR رحمة', ['رحمه'], [['بسم', 'الله']], []),
+    ('رحمة NEAR "بسم الله"', ['رحمه'], [['بسم', 'الله']], []),
+    # A chain pairs the first two words; the rest are terms
+    ('الله NEAR/3 الرحمن NEAR/2 الرحيم', ['الرحيم'], [], [('الله', 'الرحمن', 3)]),
+    # Anything but NEAR or NEAR/<digits> is an ordinary word
+    ('الله near رحمة', ['الله', 'near', 'رحمه'], [], []),
+    ('الله NEAR/x رحمة', ['الله', 'NEAR/x', 'رحمه'], [], []),
+])
+def test_near(query, terms, phrases, near):
+    parsed = parse_search_query(query)
+    assert (parsed.terms, parsed.phrases, parsed.near) == (terms, phrases, near)
+
+
+@pytest.mark.parametrize('mode', ['root', 'fuzzy'])
+def test_near_ignored_outside_text_mode(mode):
+    parsed = parse_search_query('كتاب NEAR/2 رحمة', mode)
+    assert parsed.near == [] and parsed.phrases == []
+    assert len(parsed.terms) == 2
+
+
+def test_near_cache_key_is_canonical():
+    assert (parse_search_query('الله   NEAR   رَحْمَة').cache_key()
+            == parse_search_query(f'الله NEAR/{DEFAULT_NEAR_DISTANCE} رحمة').cache_key())
@@ -0,0 +1,89 @@
+import gzip
+import json
+
+import pytest
+from starlette.requests import Request
+
+import static_responses
+from static_responses import PrerenderedJSON
+
+PAYLOAD = {"surahs": [{"number": 1, "nameAr": "الفاتحة", "nameEn": "Al-Fatihah"}]}
+
+
+def _request(**headers) -> Request:
+    return Request({
+        'type': 'http',
+        'method': 'GET',
+        'path': '/',
+        'headers': [(name.replace('_', '-').encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.fixture
+def catalog():
+    return PrerenderedJSON(PAYLOAD, cache_control='public, max-age=60')
+
+
+def test_identity_without_accept_encoding(catalog):
+    response = catalog.response(_request())
+    assert response.status_code == 200
+    assert json.loads(response.body) == PAYLOAD
+    assert 'content-encoding' not in response.headers
+    assert response.headers['etag'] == catalog.variants['identity'][0]
+    assert response.headers['cache-control'] == 'public, max-age=60'
+    assert response.headers['vary'] == 'Accept-Encoding'
+
+
+def test_gzip_when_accepted(catalog):
+    response = catalog.response(_request(accept_encoding='deflate, gzip'))
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['etag'] == catalog.variants['gzip'][0]
+    assert json.loads(gzip.decompress(response.body)) == PAYLOAD
+
+
+def test_refused_encodings_are_not_used(catalog):
+    response = catalog.response(_request(accept_encoding='gzip;q=0, br;q=0'))
+    assert 'content-encoding' not in response.headers
+    assert json.loads(response.body) == PAYLOAD
+
+
+@pytest.mark.skipif(static_responses.brotli is None, reason='brotli is not installed')
+def test_brotli_preferred_over_gzip(catalog):
+    response = catalog.response(_request(accept_encoding='gzip, br'))
+    assert response.headers['content-encoding'] == 'br'
+    assert json.loads(static_responses.brotli.decompress(response.body)) == PAYLOAD
+
+
+def test_without_brotli_br_falls_back_to_gzip(monkeypatch):
+    monkeypatch.setattr(static_responses, 'brotli', None)
+    catalog = PrerenderedJSON(PAYLOAD)
+    assert 'br' not in catalog.variants
+    assert catalog.response(_request(accept_encoding='br, gzip')).headers['content-encoding'] == 'gzip'
+    assert 'content-encoding' not in catalog.response(_request(accept_encoding='br')).headers
+
+
+def test_matching_etag_gets_304(catalog):
+    etag = catalog.response(_request(accept_encoding='gzip')).headers['etag']
+    response = catalog.response(_request(accept_encoding='gzip', if_none_match=etag))
+    assert response.status_code == 304
+    assert response.body == b''
+    assert response.headers['etag'] == etag
+
+
+@pytest.mark.parametrize('if_none_match', ['*', 'W/{etag}', '"other", {etag}'])
+def test_if_none_match_forms(catalog, if_none_match):
+    etag = catalog.variants['identity'][0]
+    response = catalog.response(_request(if_none_match=if_none_match.format(etag=etag)))
+    assert response.status_code == 304
+
+
+def test_stale_etag_gets_full_body(catalog):
+    response = catalog.response(_request(if_none_match='"stale"'))
+    assert response.status_code == 200
+    assert json.loads(response.body) == PAYLOAD
+
+
+def test_etag_changes_with_payload(catalog):
+    other = PrerenderedJSON({"surahs": []})
+    assert other.variants['identity'][0] != catalog.variants['identity'][0]
+    assert catalog.response(_request(if_none_match=other.variants['identity'][0])).status_code == 200